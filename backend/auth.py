@@ -1,14 +1,30 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from config import SECRET_KEY
+from cache import LRUCache
+from config import (
+    SECRET_KEY, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS,
+    PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING,
+)
 
 # Config
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Hashes made with other rounds (older settings) are flagged for a rehash on login
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_HASH_ROUNDS,
+)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,6 +32,54 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+
+class PasswordHasherBusy(Exception):
+    """Too many hashing jobs queued; the caller should retry later"""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a small dedicated thread pool so a burst of
+    logins cannot occupy the request threads. Jobs beyond max_pending are
+    rejected instead of queued.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self.rejected = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Returns (valid, new_hash); new_hash is set when the stored hash uses old parameters"""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {"pending": self._pending, "max_pending": self.max_pending, "rejected": self.rejected}
+
+
+password_hasher = PasswordHasher(workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -27,6 +91,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# sha256(token) -> verified payload; entries never outlive the token's exp
+_token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+
 def decode_access_token(token: str):
-    """Returns payload or raises JWTError"""
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    """Returns payload or raises JWTError (verified tokens are served from cache)"""
+    cache_key = hashlib.sha256(token.encode()).digest()
+    payload = _token_cache.get(cache_key)
+    if payload is not None:
+        return payload
+    
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    ttl = TOKEN_CACHE_TTL_SECONDS
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(cache_key, payload, ttl=ttl)
+    return payload
+
+def token_cache_stats():
+    return _token_cache.stats()
@@ -10,8 +10,91 @@ DB_PATH = os.path.join(BASE_DIR, "sql_app_fixed.db")
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
 
 FASTAPI_ENV = os.getenv("FASTAPI_ENV", "development")
+
+# Connection pool (both engines); in-memory SQLite keeps SQLAlchemy's single-connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite pragmas, applied to every new connection. The production profile
+# (FASTAPI_ENV=production or SQLITE_PRODUCTION=1) switches to WAL with
+# synchronous=NORMAL so readers never block the writer; an empty value / 0
+# leaves the SQLite default.
+SQLITE_PRODUCTION = os.getenv("SQLITE_PRODUCTION", "1" if FASTAPI_ENV == "production" else "0") == "1"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL" if SQLITE_PRODUCTION else "")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL" if SQLITE_PRODUCTION else "")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024) if SQLITE_PRODUCTION else "0"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536" if SQLITE_PRODUCTION else "0"))
+# Off by default: attempt history outlives deleted (simulation) exams
+SQLITE_FOREIGN_KEYS = os.getenv("SQLITE_FOREIGN_KEYS", "0") == "1"
+
+# Read-only engine for lag-tolerant read endpoints (exam list, exam payloads, courses):
+# a replica URL, or (SQLite) the primary file through read-only connections.
+# Without either, reads use the primary.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+SQLITE_READ_ONLY_CONNECTIONS = os.getenv("SQLITE_READ_ONLY_CONNECTIONS", "1" if SQLITE_PRODUCTION else "0") == "1"
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
 
+# Password hashing (pbkdf2_sha256); changing the rounds rehashes passwords on next login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "2"))
+
+# Caches
+EXAM_SNAPSHOT_CACHE_SIZE = int(os.getenv("EXAM_SNAPSHOT_CACHE_SIZE", "512"))
+# Snapshots are checked against the exam's updated_at on every hit; the TTL only
+# bounds how long a write that bypasses it (a script editing rows) can go unseen
+EXAM_SNAPSHOT_TTL_SECONDS = float(os.getenv("EXAM_SNAPSHOT_TTL_SECONDS", "600"))
+# Answer keys are reloaded from the database once they are older than this
+ANSWER_KEY_TTL_SECONDS = float(os.getenv("ANSWER_KEY_TTL_SECONDS", "60"))
+TOPIC_POOL_TTL_SECONDS = float(os.getenv("TOPIC_POOL_TTL_SECONDS", "300"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "3600"))
+
+# Startup warmup: published exams whose start payload is prebuilt (newest first)
+WARMUP_EXAM_SNAPSHOTS = int(os.getenv("WARMUP_EXAM_SNAPSHOTS", "50"))
+
+# Cache-Control for the student read endpoints (sent with an ETag; clients revalidate for a 304)
+READ_CACHE_CONTROL = os.getenv("READ_CACHE_CONTROL", "private, no-cache")
+
+# Static files and question image derivatives (scripts/build_image_renditions.py).
+# Renditions are generated into STATIC_DIR/renditions, which is not versioned.
+STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(BASE_DIR, "static"))
+STATIC_URL_PREFIX = "/static"
+IMAGE_RENDITION_WIDTHS = [int(w) for w in os.getenv("IMAGE_RENDITION_WIDTHS", "320,640,1024").split(",") if w.strip()]
+# Preference order: browsers take the first <source> type they support
+IMAGE_RENDITION_FORMATS = [f.strip() for f in os.getenv("IMAGE_RENDITION_FORMATS", "avif,webp").split(",") if f.strip()]
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "75"))
+IMAGE_AVIF_QUALITY = int(os.getenv("IMAGE_AVIF_QUALITY", "55"))
+# Longest side (px) of the blurred placeholder inlined in question payloads
+IMAGE_PLACEHOLDER_SIZE = int(os.getenv("IMAGE_PLACEHOLDER_SIZE", "16"))
+
+# Excel importer: processes that validate / store / encode images (0 = one per
+# core) and how many images may be queued at once (0 = two per worker)
+IMPORT_IMAGE_WORKERS = int(os.getenv("IMPORT_IMAGE_WORKERS", "0")) or os.cpu_count() or 1
+IMPORT_MAX_IN_FLIGHT = int(os.getenv("IMPORT_MAX_IN_FLIGHT", "0")) or IMPORT_IMAGE_WORKERS * 2
+
+# /static serving (static_assets.py). Content-hashed files (renditions) never
+# change, so they may be cached for a year; everything else is revalidated.
+STATIC_IMMUTABLE_CACHE_CONTROL = os.getenv("STATIC_IMMUTABLE_CACHE_CONTROL", "public, max-age=31536000, immutable")
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, no-cache")
+# Files up to STATIC_MEMORY_MAX_FILE_BYTES are served from memory (LRU of STATIC_MEMORY_CACHE_FILES files)
+STATIC_MEMORY_CACHE_FILES = int(os.getenv("STATIC_MEMORY_CACHE_FILES", "512"))
+STATIC_MEMORY_MAX_FILE_BYTES = int(os.getenv("STATIC_MEMORY_MAX_FILE_BYTES", str(256 * 1024)))
+
+# Write-behind buffer for answer tracking (flush on batch size or interval)
+RESPONSE_BUFFER_MAX_BATCH = int(os.getenv("RESPONSE_BUFFER_MAX_BATCH", "200"))
+RESPONSE_BUFFER_FLUSH_SECONDS = float(os.getenv("RESPONSE_BUFFER_FLUSH_SECONDS", "1.0"))
+# Rows kept while the database is unreachable (oldest dropped beyond this)
+RESPONSE_BUFFER_MAX_QUEUE = int(os.getenv("RESPONSE_BUFFER_MAX_QUEUE", "50000"))
+# Rejected rows kept in memory for inspection (/health shows the counts)
+RESPONSE_BUFFER_DEAD_LETTER_SIZE = int(os.getenv("RESPONSE_BUFFER_DEAD_LETTER_SIZE", "1000"))
+
 # CORS settings
 ALLOWED_ORIGINS = [
     "http://localhost:3000",
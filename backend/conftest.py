@@ -0,0 +1,117 @@
+"""
+Shared pytest setup for the backend tests.
+database.py reads DATABASE_URL when it is first imported, so the throwaway
+SQLite database is configured in pytest_configure, before any test module
+is collected. Tests that need the schema depend on the migrated_engine
+fixture.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_tmp_dir = None
+
+
+def pytest_configure(config):
+    global _tmp_dir
+    _tmp_dir = tempfile.mkdtemp(prefix="slagie-test-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+
+
+def pytest_unconfigure(config):
+    if _tmp_dir:
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def migrated_engine():
+    """The sync engine on the test database, with every migration applied"""
+    from database import engine
+    from migrations import migrate
+
+    migrate(engine)
+    return engine
+
+
+@pytest.fixture(scope="session")
+def users(migrated_engine):
+    """role -> user id for an admin and a student account (password: test123)"""
+    from auth import get_password_hash
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    accounts = {
+        role: User(email=f"{role}@test.nl", hashed_password=get_password_hash("test123"), role=role)
+        for role in ("admin", "student")
+    }
+    db.add_all(accounts.values())
+    db.commit()
+    ids = {role: user.id for role, user in accounts.items()}
+    db.close()
+    return ids
+
+
+@pytest.fixture
+def client(users):
+    """TestClient running the app lifespan (warmup, response buffer)"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """auth_headers(role) -> Authorization header for the admin or student account"""
+    headers = {}
+
+    def login(role: str = "admin") -> dict:
+        if role not in headers:
+            response = client.post("/api/auth/login", json={"email": f"{role}@test.nl", "password": "test123"})
+            headers[role] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            # Warm the principal cache so tests only see endpoint queries
+            client.get("/api/auth/me", headers=headers[role])
+        return headers[role]
+
+    return login
+
+
+@pytest.fixture(scope="session")
+def make_exam(migrated_engine):
+    """
+    make_exam(n_questions, topics=("Kennis",), **exam_fields) -> exam id.
+    Every question gets four answers of which the first is correct; questions
+    are inserted in reverse so id order differs from link order.
+    """
+    from database import SessionLocal
+    from models import Exam, ExamAnswerOption, ExamQuestionItem, exam_questions_association
+
+    def make(n_questions: int, topics=("Kennis",), **exam_fields) -> int:
+        fields = {"title": f"Examen {n_questions}", "is_published": True, "category": "Theorie",
+                  "time_limit": 30, "passing_score": 86, **exam_fields}
+        db = SessionLocal()
+        try:
+            exam = Exam(**fields)
+            db.add(exam)
+            db.flush()
+            questions = []
+            for i in range(n_questions):
+                question = ExamQuestionItem(question_text=f"Vraag {i}", cbr_topic=topics[i % len(topics)])
+                for j in range(4):
+                    question.answers.append(ExamAnswerOption(answer_text=f"Antwoord {j}", is_correct=(j == 0), order=j))
+                questions.append(question)
+            db.add_all(reversed(questions))
+            db.flush()
+            db.execute(exam_questions_association.insert(), [
+                {"exam_id": exam.id, "question_id": q.id, "order": idx} for idx, q in enumerate(questions)
+            ])
+            db.commit()
+            return exam.id
+        finally:
+            db.close()
+
+    return make
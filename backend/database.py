@@ -1,14 +1,117 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, DATABASE_READ_URL, SQLITE_READ_ONLY_CONNECTIONS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB, SQLITE_FOREIGN_KEYS,
+)
 
-engine = create_engine(DATABASE_URL, echo=False)
+# asyncio drivers for the same database (the sync engine stays for scripts and background threads)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    """Same database URL, switched to its asyncio driver"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def is_sqlite_memory(url: str) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def read_only_sqlite_url(url: str) -> str:
+    """The same SQLite file, opened with mode=ro so the connection can never write"""
+    url = make_url(url)
+    return url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+def read_database_url() -> str:
+    """URL for the read engine, or "" when reads share the primary engine"""
+    if DATABASE_READ_URL:
+        return DATABASE_READ_URL
+    if SQLITE_READ_ONLY_CONNECTIONS and is_sqlite(DATABASE_URL) and not is_sqlite_memory(DATABASE_URL):
+        return read_only_sqlite_url(DATABASE_URL)
+    return ""
+
+def engine_options(url: str) -> dict:
+    """Pool settings from config; in-memory SQLite keeps its single shared connection"""
+    if is_sqlite_memory(url):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+def sqlite_pragmas(read_only: bool = False) -> list:
+    """PRAGMA statements for a new SQLite connection (see config.py)"""
+    pragmas = [f"busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}"]
+    # The journal mode is a property of the file; only the writing side sets it
+    if SQLITE_JOURNAL_MODE and not read_only:
+        pragmas.append(f"journal_mode = {SQLITE_JOURNAL_MODE}")
+    if SQLITE_SYNCHRONOUS and not read_only:
+        pragmas.append(f"synchronous = {SQLITE_SYNCHRONOUS}")
+    if SQLITE_MMAP_SIZE:
+        pragmas.append(f"mmap_size = {SQLITE_MMAP_SIZE}")
+    if SQLITE_CACHE_SIZE_KB:
+        # Negative cache_size is in KiB rather than pages
+        pragmas.append(f"cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    pragmas.append(f"foreign_keys = {'ON' if SQLITE_FOREIGN_KEYS else 'OFF'}")
+    return pragmas
+
+def configure_sqlite(sync_engine, read_only: bool = False) -> None:
+    """Run the SQLite pragmas on every connection the engine opens"""
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+engine = create_engine(DATABASE_URL, echo=False, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(async_database_url(DATABASE_URL), echo=False, **engine_options(DATABASE_URL))
+# Objects stay usable after commit; attribute access must never trigger I/O on the event loop
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if is_sqlite(DATABASE_URL):
+    configure_sqlite(engine)
+    configure_sqlite(async_engine.sync_engine)
+
+# Read-only endpoints that tolerate lag go through get_read_db; a replica may lag the primary slightly.
+# Reads that must see the student's own write right away (progress, history) stay on the primary.
+READ_DATABASE_URL = read_database_url()
+if READ_DATABASE_URL:
+    async_read_engine = create_async_engine(async_database_url(READ_DATABASE_URL), echo=False, **engine_options(READ_DATABASE_URL))
+    if is_sqlite(READ_DATABASE_URL):
+        configure_sqlite(async_read_engine.sync_engine, read_only=True)
+else:
+    async_read_engine = async_engine
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -1,16 +1,54 @@
+from dataclasses import dataclass
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from jose import JWTError, jwt
 
-from database import get_db
+from cache import LRUCache
+from config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS
+from database import get_async_db
 from models import User
 from auth import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+
+@dataclass(frozen=True)
+class Principal:
+    """Lightweight identity of the authenticated user (all most endpoints need)"""
+    id: int
+    email: str
+    role: str
+    is_active: bool
+
+
+# user_id -> Principal; bounded and short-lived so changes made by other processes still show up
+_principal_cache = LRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(user_id: int) -> None:
+    _principal_cache.pop(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _remember_changed_user(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    # Invalidate only once the change is visible to other sessions
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_principal(user_id)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,7 +63,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except (JWTError, ValueError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    principal = _principal_cache.get(user_id)
+    if principal is None:
+        result = await db.execute(
+            select(User.id, User.email, User.role, User.is_active).where(User.id == user_id)
+        )
+        user = result.first()
+        if user is None:
+            raise credentials_exception
+        principal = Principal(id=user.id, email=user.email, role=user.role, is_active=user.is_active)
+        _principal_cache.set(user_id, principal)
+    return principal
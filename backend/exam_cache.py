@@ -0,0 +1,224 @@
+"""
+In-process caches for exam content served to students
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+from config import ANSWER_KEY_TTL_SECONDS, EXAM_SNAPSHOT_CACHE_SIZE, EXAM_SNAPSHOT_TTL_SECONDS, TOPIC_POOL_TTL_SECONDS
+from http_cache import payload_etag
+from models import ExamQuestionItem, ExamAnswerOption
+
+NO_ANSWER_TEXT = "Geen antwoord tekst beschikbaar"
+
+
+class Snapshot(NamedTuple):
+    payload: bytes
+    etag: str
+    # (created_at, updated_at) of the exam row the payload was built from
+    source: tuple = ()
+
+
+class ExamSnapshotCache:
+    """
+    Serialized student payloads (JSON bytes plus their ETag) per exam id and
+    payload kind. Every entry records the exam row's (created_at, updated_at)
+    it was built from and is only served while the row still has them, so
+    edits made here, by other API instances or by scripts that reseed ids
+    all miss the old payload, and a payload built from data that changed
+    meanwhile is never served. Invalidating only frees the memory early.
+    """
+
+    # "start": start_exam body (no correct answers), "detail": get_student_exam_detail body
+    KINDS = ("start", "detail")
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, exam_id: int, source: tuple, kind: str = "start") -> Optional[Snapshot]:
+        snapshot = self._entries.get((exam_id, kind))
+        if snapshot is None or snapshot.source != source:
+            return None
+        return snapshot
+
+    def put(self, exam_id: int, source: tuple, payload: bytes, kind: str = "start") -> Snapshot:
+        snapshot = Snapshot(payload, payload_etag(payload), source)
+        self._entries.set((exam_id, kind), snapshot)
+        return snapshot
+
+    def invalidate(self, exam_id: int) -> None:
+        for kind in self.KINDS:
+            self._entries.pop((exam_id, kind))
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+
+exam_snapshots = ExamSnapshotCache(maxsize=EXAM_SNAPSHOT_CACHE_SIZE, ttl=EXAM_SNAPSHOT_TTL_SECONDS)
+
+
+def normalize_open_answer(text: Optional[str]) -> str:
+    """Open answers are compared case-insensitive and without surrounding whitespace"""
+    return (text or "").strip().lower()
+
+
+@dataclass(frozen=True, slots=True)
+class AnswerKey:
+    """Everything needed to grade one question without touching the database"""
+    question_id: int
+    question_type: str
+    correct_option_ids: FrozenSet[int]
+    option_ids: FrozenSet[int]
+    correct_text: str
+    normalized_correct_text: Optional[str]
+    explanation: Optional[str]
+    cbr_topic: Optional[str]
+    cbr_subtopic: Optional[str]
+
+    def grade(self, selected_option_id: Optional[int] = None, answer_text: Optional[str] = None) -> bool:
+        if self.question_type == "open_question":
+            return bool(answer_text) and self.normalized_correct_text is not None \
+                and normalize_open_answer(answer_text) == self.normalized_correct_text
+        # Multiple Choice or Drag Drop (both use Option Selection)
+        return selected_option_id in self.correct_option_ids
+
+    def accepts_option(self, selected_option_id: Optional[int]) -> bool:
+        """Whether an answer may be stored as-is (selected_answer_id is a foreign key)"""
+        return selected_option_id is None or selected_option_id in self.option_ids
+
+
+class AnswerKeyIndex:
+    """
+    question_id -> AnswerKey for every exam question, kept in sync by the
+    admin endpoints. Edits made by other processes (API instances, import
+    scripts) are not seen here, so a key older than the TTL counts as
+    missing and the graders reload it.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._keys: Dict[int, AnswerKey] = {}
+        self._loaded_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, question_id: int, allow_stale: bool = False) -> Optional[AnswerKey]:
+        key = self._keys.get(question_id)
+        if key is not None and not allow_stale \
+                and time.monotonic() - self._loaded_at.get(question_id, 0.0) > self.ttl:
+            return None
+        return key
+
+    def build(self, db: Session) -> None:
+        """Load the full answer key (two queries, regardless of bank size)"""
+        keys = self._load(db, None)
+        now = time.monotonic()
+        with self._lock:
+            self._keys = keys
+            self._loaded_at = dict.fromkeys(keys, now)
+
+    def refresh(self, db: Session, question_ids: Iterable[int]) -> None:
+        """Reload the given questions, dropping the ones that no longer exist"""
+        question_ids = set(question_ids)
+        if not question_ids:
+            return
+        keys = self._load(db, question_ids)
+        now = time.monotonic()
+        with self._lock:
+            for question_id in question_ids:
+                if question_id in keys:
+                    self._keys[question_id] = keys[question_id]
+                    self._loaded_at[question_id] = now
+                else:
+                    self._keys.pop(question_id, None)
+                    self._loaded_at.pop(question_id, None)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _load(db: Session, question_ids: Optional[set]) -> Dict[int, AnswerKey]:
+        question_query = db.query(
+            ExamQuestionItem.id,
+            ExamQuestionItem.question_type,
+            ExamQuestionItem.explanation,
+            ExamQuestionItem.cbr_topic,
+            ExamQuestionItem.cbr_subtopic,
+        )
+        answer_query = db.query(
+            ExamAnswerOption.id,
+            ExamAnswerOption.question_id,
+            ExamAnswerOption.answer_text,
+            ExamAnswerOption.is_correct,
+        ).order_by(ExamAnswerOption.id)
+        if question_ids is not None:
+            question_query = question_query.filter(ExamQuestionItem.id.in_(question_ids))
+            answer_query = answer_query.filter(ExamAnswerOption.question_id.in_(question_ids))
+
+        options: Dict[int, list] = {}
+        for answer in answer_query:
+            options.setdefault(answer.question_id, []).append(answer)
+
+        keys = {}
+        for q in question_query:
+            answers = options.get(q.id, [])
+            correct = [a for a in answers if a.is_correct]
+            correct_text = correct[0].answer_text if correct else None
+            keys[q.id] = AnswerKey(
+                question_id=q.id,
+                question_type=q.question_type,
+                correct_option_ids=frozenset(a.id for a in correct),
+                option_ids=frozenset(a.id for a in answers),
+                correct_text=correct_text or NO_ANSWER_TEXT,
+                normalized_correct_text=normalize_open_answer(correct_text) if correct_text is not None else None,
+                explanation=q.explanation,
+                cbr_topic=q.cbr_topic,
+                cbr_subtopic=q.cbr_subtopic,
+            )
+        return keys
+
+
+answer_keys = AnswerKeyIndex(ttl=ANSWER_KEY_TTL_SECONDS)
+
+
+class TopicPoolCache:
+    """
+    Question id pools for the CBR simulation: Gevaarherkenning, Kennis and
+    Inzicht (every other non-empty topic). Loaded with one query and reused
+    until the question bank changes or the TTL passes (imports run in
+    other processes).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._pools: Optional[Dict[str, Tuple[int, ...]]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> Dict[str, Tuple[int, ...]]:
+        pools = self._pools
+        if pools is None or time.monotonic() - self._loaded_at > self.ttl:
+            pools = self._load(db)
+            with self._lock:
+                self._pools = pools
+                self._loaded_at = time.monotonic()
+        return pools
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._pools = None
+
+    @staticmethod
+    def _load(db: Session) -> Dict[str, Tuple[int, ...]]:
+        pools = {"Gevaarherkenning": [], "Kennis": [], "Inzicht": []}
+        for q_id, topic in db.query(ExamQuestionItem.id, ExamQuestionItem.cbr_topic):
+            if topic is None:
+                continue
+            pools[topic if topic in ("Gevaarherkenning", "Kennis") else "Inzicht"].append(q_id)
+        return {topic: tuple(ids) for topic, ids in pools.items()}
+
+
+topic_pools = TopicPoolCache(ttl=TOPIC_POOL_TTL_SECONDS)
@@ -0,0 +1,193 @@
+"""
+Diff-based exam updates.
+An admin save is turned into a changeset (inserted / updated / deleted /
+unchanged questions and answers plus link changes) and applied with bulk
+statements, so unchanged rows cost nothing.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Exam, ExamQuestionItem, ExamAnswerOption, QuestionImageRendition, exam_questions_association
+from topic_stats import rebuild_topic_stats
+
+QUESTION_FIELDS = ("question_text", "question_image", "question_type", "cbr_topic", "cbr_subtopic", "explanation")
+# Derived from question_image; cleared when it changes (scripts/build_image_renditions.py rebuilds them)
+IMAGE_PREVIEW_FIELDS = ("image_width", "image_height", "image_color", "image_placeholder")
+ANSWER_FIELDS = ("answer_text", "is_correct", "order", "x_position", "y_position")
+
+
+@dataclass
+class ExamChangeset:
+    # New questions as ({column: value}, [answer rows]) in submitted order
+    inserted_questions: List[tuple] = field(default_factory=list)
+    # {"id": ..., <changed columns>} rows for bulk UPDATE by primary key
+    updated_questions: List[dict] = field(default_factory=list)
+    unchanged_question_ids: List[int] = field(default_factory=list)
+    # Questions dropped from this exam (unlinked, the item itself is kept)
+    removed_question_ids: List[int] = field(default_factory=list)
+    # Updated questions with a new question_image (their renditions are dropped)
+    image_changed_question_ids: List[int] = field(default_factory=list)
+    # Updated questions with a new cbr_topic (their answerers' topic stats are rebuilt)
+    topic_changed_question_ids: List[int] = field(default_factory=list)
+
+    inserted_answers: List[dict] = field(default_factory=list)
+    updated_answers: List[dict] = field(default_factory=list)
+    deleted_answers: List[dict] = field(default_factory=list)
+    unchanged_answer_ids: List[int] = field(default_factory=list)
+
+    # Submitted question order; None marks the position of the next inserted question
+    question_order: List[Optional[int]] = field(default_factory=list)
+    current_order: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def changed_question_ids(self) -> set:
+        """Existing questions whose content or answers change"""
+        ids = {q["id"] for q in self.updated_questions}
+        ids.update(a["question_id"] for a in self.inserted_answers)
+        ids.update(a["question_id"] for a in self.updated_answers)
+        ids.update(a["question_id"] for a in self.deleted_answers)
+        return ids
+
+    @property
+    def links_changed(self) -> bool:
+        if self.inserted_questions or self.removed_question_ids:
+            return True
+        return any(self.current_order.get(q_id) != idx for idx, q_id in enumerate(self.question_order))
+
+    @property
+    def is_empty(self) -> bool:
+        return not (
+            self.inserted_questions or self.updated_questions or self.removed_question_ids
+            or self.inserted_answers or self.updated_answers or self.deleted_answers
+            or self.links_changed
+        )
+
+
+def _changed_fields(obj, data, fields: Sequence[str]) -> dict:
+    return {f: getattr(data, f) for f in fields if getattr(obj, f) != getattr(data, f)}
+
+
+async def compute_changeset(db: AsyncSession, exam: Exam, submitted_questions) -> ExamChangeset:
+    """Compare the submitted questions with the loaded exam (questions + answers eagerly loaded)"""
+    changes = ExamChangeset()
+    existing_questions = {q.id: q for q in exam.questions}
+    link = exam_questions_association
+    result = await db.execute(select(link.c.question_id, link.c.order).where(link.c.exam_id == exam.id))
+    changes.current_order = {row.question_id: row.order for row in result}
+
+    kept = set()
+    for q_data in submitted_questions:
+        question = existing_questions.get(q_data.id) if q_data.id else None
+        if question is None or q_data.id in kept:
+            changes.inserted_questions.append((
+                {f: getattr(q_data, f) for f in QUESTION_FIELDS},
+                [{f: getattr(a, f) for f in ANSWER_FIELDS} for a in q_data.answers],
+            ))
+            changes.question_order.append(None)
+            continue
+
+        kept.add(question.id)
+        changes.question_order.append(question.id)
+        diff = _changed_fields(question, q_data, QUESTION_FIELDS)
+        if "question_image" in diff:
+            diff.update(dict.fromkeys(IMAGE_PREVIEW_FIELDS))
+            changes.image_changed_question_ids.append(question.id)
+        if "cbr_topic" in diff:
+            changes.topic_changed_question_ids.append(question.id)
+        if diff:
+            changes.updated_questions.append({"id": question.id, **diff})
+        else:
+            changes.unchanged_question_ids.append(question.id)
+
+        existing_answers = {a.id: a for a in question.answers}
+        submitted_answer_ids = {a.id for a in q_data.answers if a.id is not None}
+        for a_id in existing_answers:
+            if a_id not in submitted_answer_ids:
+                changes.deleted_answers.append({"id": a_id, "question_id": question.id})
+        for a_data in q_data.answers:
+            answer = existing_answers.get(a_data.id) if a_data.id else None
+            if answer is None:
+                changes.inserted_answers.append(
+                    {"question_id": question.id, **{f: getattr(a_data, f) for f in ANSWER_FIELDS}}
+                )
+                continue
+            a_diff = _changed_fields(answer, a_data, ANSWER_FIELDS)
+            if a_diff:
+                changes.updated_answers.append({"id": answer.id, "question_id": question.id, **a_diff})
+            else:
+                changes.unchanged_answer_ids.append(answer.id)
+
+    changes.removed_question_ids = [q_id for q_id in existing_questions if q_id not in kept]
+    return changes
+
+
+async def apply_changeset(db: AsyncSession, exam_id: int, changes: ExamChangeset) -> List[int]:
+    """Write the changeset with bulk statements; returns the ids of the inserted questions"""
+    new_ids: List[int] = []
+    answer_rows = list(changes.inserted_answers)
+
+    if changes.inserted_questions:
+        result = await db.execute(
+            insert(ExamQuestionItem).returning(ExamQuestionItem.id, sort_by_parameter_order=True),
+            [q_row for q_row, _ in changes.inserted_questions],
+        )
+        new_ids = list(result.scalars())
+        for q_id, (_, answers) in zip(new_ids, changes.inserted_questions):
+            answer_rows.extend({"question_id": q_id, **a} for a in answers)
+
+    if changes.updated_questions:
+        await db.execute(update(ExamQuestionItem), changes.updated_questions)
+    if changes.image_changed_question_ids:
+        await db.execute(
+            delete(QuestionImageRendition)
+            .where(QuestionImageRendition.question_id.in_(changes.image_changed_question_ids))
+            .execution_options(synchronize_session=False)
+        )
+    if changes.deleted_answers:
+        await db.execute(
+            delete(ExamAnswerOption)
+            .where(ExamAnswerOption.id.in_([a["id"] for a in changes.deleted_answers]))
+            .execution_options(synchronize_session=False)
+        )
+    if changes.updated_answers:
+        await db.execute(update(ExamAnswerOption), [
+            {k: v for k, v in row.items() if k != "question_id"} for row in changes.updated_answers
+        ])
+    if answer_rows:
+        await db.execute(insert(ExamAnswerOption), answer_rows)
+
+    # Links: unlink removed questions, link new ones, fix positions that moved
+    link = exam_questions_association
+    if changes.removed_question_ids:
+        await db.execute(link.delete().where(
+            link.c.exam_id == exam_id,
+            link.c.question_id.in_(changes.removed_question_ids),
+        ))
+    new_id_iter = iter(new_ids)
+    final_order = [q_id if q_id is not None else next(new_id_iter) for q_id in changes.question_order]
+    new_links = []
+    moved_links = []
+    for idx, q_id in enumerate(final_order):
+        if q_id not in changes.current_order:
+            new_links.append({"exam_id": exam_id, "question_id": q_id, "order": idx})
+        elif changes.current_order[q_id] != idx:
+            moved_links.append({"b_question_id": q_id, "b_order": idx})
+    if new_links:
+        await db.execute(link.insert(), new_links)
+    if moved_links:
+        await db.execute(
+            link.update()
+            .where(link.c.exam_id == exam_id, link.c.question_id == bindparam("b_question_id"))
+            .values(order=bindparam("b_order")),
+            moved_links,
+        )
+
+    if changes.topic_changed_question_ids:
+        # Counters are kept per topic; past answers now count towards the new one
+        conn = await db.connection()
+        await conn.run_sync(rebuild_topic_stats, changes.topic_changed_question_ids)
+
+    return new_ids
@@ -0,0 +1,46 @@
+"""
+HTTP validators for the student read endpoints.
+Responses carry a strong ETag derived from their content (the cached
+payload bytes, or the rows / version columns the body is built from). A
+request whose If-None-Match matches gets an empty 304 before anything is
+serialized.
+"""
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+from config import READ_CACHE_CONTROL
+
+
+def payload_etag(payload: bytes) -> str:
+    """Strong ETag for serialized bytes"""
+    return f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag for the values a response is built from (rows, version columns)"""
+    return payload_etag(repr(parts).encode())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def cache_headers(etag: str) -> dict:
+    # Bodies can depend on the caller's role, so shared caches must key on the token
+    return {"ETag": etag, "Cache-Control": READ_CACHE_CONTROL, "Vary": "Authorization"}
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers.update(cache_headers(etag))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -0,0 +1,83 @@
+"""
+Content-addressed store for imported question images.
+A blob is named after the sha256 of its bytes (static/blobs/ab/<sha256>.png),
+so an image embedded many times is stored once, a re-import skips blobs that
+are already there, and a blob URL keeps pointing at the same bytes forever.
+Which question shows which blob is recorded in question_images; blobs no
+question references are removed by scripts/gc_image_blobs.py.
+"""
+import hashlib
+import io
+import os
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from config import STATIC_DIR, STATIC_URL_PREFIX
+
+BLOBS_SUBDIR = "blobs"
+BLOBS_DIR = os.path.join(STATIC_DIR, BLOBS_SUBDIR)
+
+# Pillow format -> file extension (decides the Content-Type /static sends)
+EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "GIF": "gif", "WEBP": "webp", "BMP": "bmp", "TIFF": "tif", "MPO": "jpg"}
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    extension: str
+    byte_size: int
+    written: bool  # False when the blob was already in the store
+
+
+def image_extension(data: bytes) -> str:
+    """File extension for encoded image bytes (reads the header only)"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return EXTENSIONS.get(image.format, (image.format or "bin").lower())
+    except Exception:
+        return "bin"
+
+
+class BlobStore:
+    def __init__(self, root: str = BLOBS_DIR):
+        self.root = root
+
+    def relative_path(self, sha256: str, extension: str) -> str:
+        # Two-level fan-out keeps directories small
+        return f"{sha256[:2]}/{sha256}.{extension}"
+
+    def path(self, sha256: str, extension: str) -> str:
+        return os.path.join(self.root, self.relative_path(sha256, extension))
+
+    def url(self, sha256: str, extension: str) -> str:
+        return f"{STATIC_URL_PREFIX}/{BLOBS_SUBDIR}/{self.relative_path(sha256, extension)}"
+
+    def put(self, data: bytes, extension: Optional[str] = None) -> StoredBlob:
+        sha256 = hashlib.sha256(data).hexdigest()
+        extension = extension or image_extension(data)
+        path = self.path(sha256, extension)
+        if os.path.exists(path):
+            return StoredBlob(sha256, extension, len(data), False)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a reader never sees a partial blob under its final name
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return StoredBlob(sha256, extension, len(data), True)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        """(sha256, path) of every blob on disk"""
+        if not os.path.isdir(self.root):
+            return
+        for shard in sorted(os.listdir(self.root)):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in sorted(os.listdir(shard_dir)):
+                sha256, _, extension = name.partition(".")
+                if len(sha256) == 64 and "." not in extension:
+                    yield sha256, os.path.join(shard_dir, name)
+
+
+blob_store = BlobStore()
@@ -0,0 +1,247 @@
+"""
+Compressed derivatives (renditions) of question images.
+An original is decoded once and re-encoded in every configured format at
+every configured width it is large enough for. Files are named after a hash
+of their own bytes, so a rendition URL never changes content and the
+student payloads can offer them as a srcset per format. The same decode
+gives the preview stored on the question: dimensions, dominant color and a
+blurred placeholder small enough to inline as a data URI.
+Build them with: python scripts/build_image_renditions.py (the Excel importer
+builds them while importing, see ingest_image).
+"""
+import base64
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from PIL import Image, ImageFilter, features
+
+from config import (
+    IMAGE_AVIF_QUALITY,
+    IMAGE_PLACEHOLDER_SIZE,
+    IMAGE_RENDITION_FORMATS,
+    IMAGE_RENDITION_WIDTHS,
+    IMAGE_WEBP_QUALITY,
+    STATIC_DIR,
+    STATIC_URL_PREFIX,
+)
+from image_store import StoredBlob, blob_store
+
+RENDITIONS_SUBDIR = "renditions"
+RENDITIONS_DIR = os.path.join(STATIC_DIR, RENDITIONS_SUBDIR)
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+# Configured formats this Pillow build can encode (AVIF needs Pillow >= 11.2 built with libavif);
+# the others are skipped rather than failing every image
+ENCODABLE_FORMATS = [fmt for fmt in IMAGE_RENDITION_FORMATS if features.check(fmt)]
+UNAVAILABLE_FORMATS = [fmt for fmt in IMAGE_RENDITION_FORMATS if fmt not in ENCODABLE_FORMATS]
+
+
+@dataclass(frozen=True)
+class Rendition:
+    format: str
+    width: int
+    height: int
+    filename: str
+    data: bytes
+
+
+class RenditionFile(NamedTuple):
+    """A written rendition (what question_image_renditions records)"""
+    format: str
+    width: int
+    height: int
+    byte_size: int
+    path: str
+
+
+class ImagePreview(NamedTuple):
+    """Stored on the question (image_width, image_height, image_color, image_placeholder)"""
+    width: int
+    height: int
+    color: str  # "#rrggbb"
+    placeholder: str  # data:image/webp;base64,...
+
+
+class IngestedImage(NamedTuple):
+    blob: StoredBlob
+    preview: Optional[ImagePreview]  # None when the image could not be decoded
+    renditions: List[RenditionFile]
+    errors: Tuple[str, ...] = ()  # Derivatives that could not be built ("avif: ...")
+
+
+def source_digest(data: bytes) -> str:
+    """sha256 of an original; renditions are rebuilt only when it changes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=IMAGE_WEBP_QUALITY, method=5)
+    elif fmt == "avif":
+        image.save(buffer, "AVIF", quality=IMAGE_AVIF_QUALITY, speed=6)
+    else:
+        raise ValueError(f"Unsupported rendition format: {fmt}")
+    return buffer.getvalue()
+
+
+def target_widths(original_width: int, widths: Iterable[int]) -> List[int]:
+    """Configured widths below the original, plus the original capped at the largest one"""
+    widths = sorted(set(widths))
+    if not widths:
+        return []
+    targets = [w for w in widths if w < original_width]
+    targets.append(min(original_width, widths[-1]))
+    return sorted(set(targets))
+
+
+def decode(data: bytes) -> Image.Image:
+    """Decode an original to RGB (RGBA when it has transparency)"""
+    with Image.open(io.BytesIO(data)) as original:
+        original.load()
+        has_alpha = original.mode in ("RGBA", "LA", "PA") or "transparency" in original.info
+        return original.convert("RGBA" if has_alpha else "RGB")
+
+
+def image_preview(image: Image.Image) -> ImagePreview:
+    small = image.copy()
+    small.thumbnail((IMAGE_PLACEHOLDER_SIZE, IMAGE_PLACEHOLDER_SIZE), Image.Resampling.BOX)
+    if small.mode == "RGBA":
+        # Transparent areas show the page background (white)
+        small = Image.alpha_composite(Image.new("RGBA", small.size, "white"), small)
+    small = small.convert("RGB")
+
+    # Most frequent color of a 4-color palette, so a large flat area wins over the average
+    palette = small.quantize(colors=4)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+
+    buffer = io.BytesIO()
+    small.filter(ImageFilter.GaussianBlur(1)).save(buffer, "WEBP", quality=40)
+    return ImagePreview(
+        width=image.width,
+        height=image.height,
+        color=f"#{red:02x}{green:02x}{blue:02x}",
+        placeholder="data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode(),
+    )
+
+
+def make_renditions(
+    image: Image.Image,
+    widths: Iterable[int] = IMAGE_RENDITION_WIDTHS,
+    formats: Iterable[str] = ENCODABLE_FORMATS,
+    errors: Optional[List[str]] = None,
+) -> List[Rendition]:
+    """
+    Every rendition of a decoded image. A format that fails to encode is
+    skipped (reported in errors) without affecting the other formats.
+    """
+    renditions = []
+    failed = set()
+    for width in target_widths(image.width, widths):
+        if width == image.width:
+            resized = image
+        else:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            if fmt in failed:
+                continue
+            try:
+                payload = _encode(resized, fmt)
+            except Exception as e:
+                failed.add(fmt)
+                if errors is not None:
+                    errors.append(f"{fmt}: {e!r}")
+                continue
+            digest = hashlib.sha256(payload).hexdigest()[:16]
+            renditions.append(Rendition(
+                format=fmt,
+                width=resized.width,
+                height=resized.height,
+                filename=f"{digest}-{resized.width}w.{fmt}",
+                data=payload,
+            ))
+    return renditions
+
+
+def write_rendition(rendition: Rendition, directory: str = RENDITIONS_DIR) -> str:
+    """Write a rendition unless a file with the same (content-hashed) name exists"""
+    path = os.path.join(directory, rendition.filename)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(rendition.data)
+        os.replace(tmp_path, path)
+    return path
+
+
+def rendition_url(filename: str) -> str:
+    return f"{STATIC_URL_PREFIX}/{RENDITIONS_SUBDIR}/{filename}"
+
+
+def store_renditions(image: Image.Image, errors: Optional[List[str]] = None) -> List[RenditionFile]:
+    """Encode and write every rendition of a decoded original (formats that fail go to errors)"""
+    files = []
+    for rendition in make_renditions(image, errors=errors):
+        write_rendition(rendition)
+        files.append(RenditionFile(
+            rendition.format, rendition.width, rendition.height, len(rendition.data), rendition_url(rendition.filename)
+        ))
+    return files
+
+
+def ingest_image(data: bytes) -> IngestedImage:
+    """
+    Validate, store and derive one imported image. Runs in the importer's
+    worker processes: everything is written to disk here and only metadata
+    goes back to the parent. Once the original passes validation it is
+    stored and returned even if its preview or renditions cannot be built,
+    so the question always keeps its image.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image.verify()  # Raises on truncated / corrupt files
+    blob = blob_store.put(data)
+    errors = []
+    try:
+        image = decode(data)
+        preview = image_preview(image)
+    except Exception as e:
+        errors.append(f"decode: {e!r}")
+        return IngestedImage(blob, None, [], tuple(errors))
+    renditions = store_renditions(image, errors)
+    return IngestedImage(blob, preview, renditions, tuple(errors))
+
+
+def static_file_path(image_url: Optional[str]) -> Optional[str]:
+    """Local file behind a question_image URL served from /static (None for external images)"""
+    if not image_url:
+        return None
+    path = urlparse(image_url).path
+    if not path.startswith(STATIC_URL_PREFIX + "/"):
+        return None
+    relative = os.path.normpath(path[len(STATIC_URL_PREFIX) + 1:])
+    if relative.startswith("..") or os.path.isabs(relative):
+        return None
+    return os.path.join(STATIC_DIR, relative)
+
+
+def image_sources(renditions) -> List[dict]:
+    """
+    <picture> sources for a question: one {"type", "srcset"} per format, in
+    IMAGE_RENDITION_FORMATS preference order, widths ascending.
+    """
+    by_format = {}
+    for r in sorted(renditions, key=lambda r: r.width):
+        by_format.setdefault(r.format, []).append(f"{r.path} {r.width}w")
+    order = {fmt: i for i, fmt in enumerate(IMAGE_RENDITION_FORMATS)}
+    return [
+        {"type": MIME_TYPES.get(fmt, f"image/{fmt}"), "srcset": ", ".join(candidates)}
+        for fmt, candidates in sorted(by_format.items(), key=lambda item: order.get(item[0], len(order)))
+    ]
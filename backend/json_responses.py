@@ -0,0 +1,23 @@
+"""
+JSON response rendering.
+Every route renders with orjson: response_model routes validate once and
+hand orjson the JSON-mode dict, untyped routes skip json.dumps. Prebuilt
+(cached) payloads are sent as-is without re-validation.
+Compare the paths with scripts/bench_serialization.py.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def raw_json_response(payload: bytes, **kwargs) -> Response:
+    """Send already-serialized (cached) JSON bytes"""
+    return Response(content=payload, media_type="application/json", **kwargs)
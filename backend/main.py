@@ -2,22 +2,68 @@
 Main FastAPI Application for Slagie Platform
 Driving Theory Exam Platform (CBR)
 """
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from sqlalchemy.orm import configure_mappers
 import os
 
-from database import Base, engine
+from auth import token_cache_stats, password_hasher
+from config import STATIC_DIR
+from database import engine, async_engine, async_read_engine, SessionLocal
+from exam_cache import answer_keys
+from json_responses import OrjsonResponse
+from migrations import pending_migrations
+from pagination import NEXT_CURSOR_HEADER
+from response_buffer import response_buffer
 from routers import auth, exams, courses, chat
+from static_assets import AssetFiles
+from warmup import readiness, warm_caches
+
+readiness.process_started = _import_started
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build in-memory indexes before serving traffic, then warm the caches in the background"""
+    readiness.begin()
+    readiness.steps["import"] = round((time.perf_counter() - _import_started) * 1000, 1)
+    # Schema changes are applied by scripts/migrate.py, never by the workers
+    with readiness.step("migration_check"):
+        with engine.connect() as conn:
+            pending = pending_migrations(conn)
+    if pending:
+        print(f"⚠️  {len(pending)} pending migration(s); run: python scripts/migrate.py")
+    with readiness.step("configure_mappers"):
+        configure_mappers()
+    # Grading reads only the answer key index, so it is built before the first request
+    with readiness.step("answer_keys"):
+        db = SessionLocal()
+        try:
+            answer_keys.build(db)
+        finally:
+            db.close()
+    response_buffer.start()
+    warmup = asyncio.create_task(asyncio.to_thread(warm_caches, app))
+    yield
+    readiness.draining = True
+    await warmup
+    # Drain buffered answer rows before the worker exits
+    response_buffer.stop()
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title="Slagie API",
     description="CBR Theorie Examen Platform - Auto Theorie",
-    version="3.0.0"
+    version="3.0.0",
+    default_response_class=OrjsonResponse,
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -32,6 +78,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -40,17 +87,38 @@ app.include_router(courses.router, prefix="/api/v1", tags=["courses"])
 app.include_router(exams.router, prefix="/api", tags=["exams"])
 app.include_router(chat.router, prefix="/api", tags=["chat"])
 
-# Mount static files for images
-static_path = os.path.join(os.path.dirname(__file__), "static")
-if os.path.exists(static_path):
-    app.mount("/static", StaticFiles(directory=static_path), name="static")
+# Mount static files for images (immutable caching for content-hashed renditions)
+static_files = None
+if os.path.exists(STATIC_DIR):
+    static_files = AssetFiles(directory=STATIC_DIR)
+    app.mount("/static", static_files, name="static")
 else:
-    print(f"⚠️  Warning: Static directory not found at {static_path}")
+    print(f"⚠️  Warning: Static directory not found at {STATIC_DIR}")
+
+@app.get("/health/live")
+def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def readiness_check(response: Response):
+    """Readiness: 503 until the startup warmup has finished (and again while shutting down)"""
+    if not readiness.is_ready:
+        response.status_code = 503
+    return readiness.report()
 
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "service": "Slagie API v3 - Auth Enabled"}
+    return {
+        "status": "ok",
+        "service": "Slagie API v3 - Auth Enabled",
+        "readiness": readiness.report(),
+        "response_buffer": response_buffer.stats(),
+        "token_cache": token_cache_stats(),
+        "password_hasher": password_hasher.stats(),
+        "static_files": static_files.stats() if static_files else None
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,118 @@
+"""
+Versioned schema migrations.
+Each migration runs once, in its own transaction, and is recorded in the
+schema_migrations table. Nothing runs at import time; apply them before
+starting the API:
+    python scripts/migrate.py
+"""
+from typing import Callable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from database import Base
+import models  # noqa: F401  (registers the tables on Base.metadata)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+_migrations_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _migrations_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def _baseline(conn: Connection) -> None:
+    # Creates whatever tables are missing; existing databases keep their data
+    Base.metadata.create_all(bind=conn)
+
+
+# (index name, table, columns) for the filters the student and admin endpoints hit on every request
+HOT_PATH_INDEXES = (
+    ("ix_user_question_responses_user_id", "user_question_responses", ("user_id",)),
+    ("ix_user_question_responses_question_id", "user_question_responses", ("question_id",)),
+    ("ix_exam_question_items_cbr_topic", "exam_question_items", ("cbr_topic",)),
+    ("ix_user_exam_attempts_user_completed", "user_exam_attempts", ("user_id", "completed_at")),
+    ("ix_exams_published_created", "exams", ("is_published", "created_at")),
+    ("ix_exam_questions_link_exam_order", "exam_questions_link", ("exam_id", "order")),
+)
+
+
+def create_hot_path_indexes(conn: Connection) -> None:
+    quote = conn.dialect.identifier_preparer.quote
+    for name, table, columns in HOT_PATH_INDEXES:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(quote(c) for c in columns)})"
+        ))
+
+
+def _backfill_topic_stats(conn: Connection) -> None:
+    # user_topic_stats was created empty on existing databases; fill it from the response history
+    from topic_stats import rebuild_topic_stats
+    rebuild_topic_stats(conn)
+
+
+def _create_tables(*names: str) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection) -> None:
+        Base.metadata.create_all(bind=conn, tables=[Base.metadata.tables[name] for name in names])
+    return upgrade
+
+
+def _add_columns(table_name: str, *names: str) -> Callable[[Connection], None]:
+    # Databases created by a newer baseline already have them
+    def upgrade(conn: Connection) -> None:
+        table = Base.metadata.tables[table_name]
+        existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+        quote = conn.dialect.identifier_preparer.quote
+        for name in names:
+            if name not in existing:
+                column_type = table.c[name].type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(name)} {column_type}"))
+    return upgrade
+
+
+MIGRATIONS = (
+    Migration(1, "baseline schema", _baseline),
+    Migration(2, "hot-path index pack", create_hot_path_indexes),
+    Migration(3, "question image renditions", _create_tables("question_image_renditions")),
+    Migration(4, "content-addressed image blobs", _create_tables("image_blobs", "question_images")),
+    Migration(5, "question image previews", _add_columns(
+        "exam_question_items", "image_width", "image_height", "image_color", "image_placeholder"
+    )),
+    Migration(6, "backfill user_topic_stats", _backfill_topic_stats),
+)
+
+
+def applied_versions(conn: Connection) -> Set[int]:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return set()
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(conn: Connection) -> List[Migration]:
+    applied = applied_versions(conn)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to target (default: all); returns the ones applied"""
+    _migrations_metadata.create_all(bind=engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as conn:
+            if migration.version in applied_versions(conn):
+                continue
+            migration.upgrade(conn)
+            conn.execute(insert(schema_migrations).values(version=migration.version, name=migration.name))
+        applied.append(migration)
+    return applied
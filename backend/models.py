@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Table, Float
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Table, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -123,13 +125,19 @@ exam_questions_association = Table(
     Base.metadata,
     Column('exam_id', Integer, ForeignKey('exams.id'), primary_key=True),
     Column('question_id', Integer, ForeignKey('exam_question_items.id'), primary_key=True),
-    Column('order', Integer, default=0)
+    Column('order', Integer, default=0),
+    # Questions are always read per exam in link order
+    Index('ix_exam_questions_link_exam_order', 'exam_id', 'order')
 )
 
 
 class Exam(Base):
     """Admin-created exams with publish/draft functionality"""
     __tablename__ = "exams"
+    __table_args__ = (
+        # Student and admin lists filter on status, newest first
+        Index("ix_exams_published_created", "is_published", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -147,14 +155,16 @@ class Exam(Base):
     # Metadata
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set in Python for microsecond precision: it is the content version of cached exam payloads
+    updated_at = Column(DateTime(timezone=True), onupdate=datetime.utcnow)
     published_at = Column(DateTime(timezone=True))
     
     # Relationships
     questions = relationship(
         "ExamQuestionItem",
         secondary=exam_questions_association,
-        back_populates="exams"
+        back_populates="exams",
+        order_by=exam_questions_association.c.order
     )
     creator = relationship("User", back_populates="created_exams", foreign_keys=[created_by])
     
@@ -172,10 +182,15 @@ class ExamQuestionItem(Base):
     # Question content
     question_text = Column(Text, nullable=False)
     question_image = Column(String(500))  # Optional image URL
+    # Image preview, computed at import (see images.image_preview)
+    image_width = Column(Integer)
+    image_height = Column(Integer)
+    image_color = Column(String(7))  # Dominant color, "#rrggbb"
+    image_placeholder = Column(Text)  # Tiny blurred WebP as a data URI
     question_type = Column(String(50), default="multiple_choice")
     
     # CBR Metadata
-    cbr_topic = Column(String(255))  # e.g. "Gevaarherkenning"
+    cbr_topic = Column(String(255), index=True)  # e.g. "Gevaarherkenning"
     cbr_subtopic = Column(String(255))  # e.g. "Verantwoorde verkeersdeelname..."
     explanation = Column(Text)  # Optional manual explanation if added later
     
@@ -185,12 +200,60 @@ class ExamQuestionItem(Base):
         secondary=exam_questions_association,
         back_populates="questions"
     )
-    answers = relationship("ExamAnswerOption", back_populates="question", cascade="all, delete-orphan")
+    answers = relationship(
+        "ExamAnswerOption",
+        back_populates="question",
+        cascade="all, delete-orphan",
+        order_by="(ExamAnswerOption.order, ExamAnswerOption.id)"
+    )
+    image_renditions = relationship(
+        "QuestionImageRendition",
+        back_populates="question",
+        cascade="all, delete-orphan",
+        order_by="(QuestionImageRendition.format, QuestionImageRendition.width)"
+    )
     
     def __repr__(self):
         return f"<ExamQuestionItem(id={self.id}, text={self.question_text[:30]}...)>"
 
 
+class QuestionImageRendition(Base):
+    """Compressed derivative of a question image: one format at one width"""
+    __tablename__ = "question_image_renditions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("exam_question_items.id"), nullable=False, index=True)
+    
+    source_sha256 = Column(String(64), nullable=False)  # Original the rendition was built from
+    format = Column(String(10), nullable=False)  # "avif" / "webp"
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    byte_size = Column(Integer, nullable=False)
+    path = Column(String(500), nullable=False)  # URL path, e.g. /static/renditions/<hash>-640w.webp
+    
+    question = relationship("ExamQuestionItem", back_populates="image_renditions")
+
+
+class ImageBlob(Base):
+    """Imported image stored once by content hash (see image_store.py)"""
+    __tablename__ = "image_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    extension = Column(String(10), nullable=False)
+    byte_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class QuestionImage(Base):
+    """Which blob a question shows; blobs nothing points at are garbage-collected"""
+    __tablename__ = "question_images"
+    
+    question_id = Column(Integer, ForeignKey("exam_question_items.id"), primary_key=True)
+    blob_sha256 = Column(String(64), ForeignKey("image_blobs.sha256"), nullable=False, index=True)
+    
+    blob = relationship("ImageBlob")
+
+
 class ExamAnswerOption(Base):
     """Answer options for exam questions"""
     __tablename__ = "exam_answer_options"
@@ -266,8 +329,8 @@ class UserQuestionResponse(Base):
     __tablename__ = "user_question_responses"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    question_id = Column(Integer, ForeignKey("exam_question_items.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    question_id = Column(Integer, ForeignKey("exam_question_items.id"), nullable=False, index=True)
     exam_id = Column(Integer, ForeignKey("exams.id"), nullable=True) # Context (which exam)
     
     is_correct = Column(Boolean, nullable=False)
@@ -283,6 +346,10 @@ class UserQuestionResponse(Base):
 class UserExamAttempt(Base):
     """Tracks overall exam attempts"""
     __tablename__ = "user_exam_attempts"
+    __table_args__ = (
+        # History is read per user, newest first
+        Index("ix_user_exam_attempts_user_completed", "user_id", "completed_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -298,3 +365,13 @@ class UserExamAttempt(Base):
     # Relationships
     user = relationship("User")
     exam = relationship("Exam")
+
+class UserTopicStat(Base):
+    """Running answer totals per user and CBR topic (kept up to date as responses are recorded)"""
+    __tablename__ = "user_topic_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    cbr_topic = Column(String(255), primary_key=True)
+    
+    answered = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
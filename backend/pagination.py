@@ -0,0 +1,55 @@
+"""
+Opaque keyset (cursor) pagination helpers.
+A cursor encodes the id of the last row on a page; the next page continues
+strictly after that row's (sort value, id), so deep pages cost the same as
+the first one.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, select
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """Decode a cursor into values of the given types, or raise 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded))
+        if len(raw) != len(types):
+            raise ValueError("wrong cursor length")
+        return [
+            None if v is None else datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(raw, types)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def keyset_before(sort_column, id_column, last_id: int):
+    """
+    Rows after last_id for descending (sort_column, id) pages. The sort value
+    is read from the row itself in a subquery, so it is compared on the typed
+    column rather than round-tripped through the cursor. If that row is gone
+    meanwhile, paging continues by id.
+    """
+    anchor = select(sort_column).where(id_column == last_id).correlate(None).scalar_subquery()
+    return or_(
+        sort_column < anchor,
+        and_(sort_column == anchor, id_column < last_id),
+        and_(anchor.is_(None), id_column < last_id),
+    )
@@ -0,0 +1,164 @@
+"""
+Write-behind buffer for UserQuestionResponse rows.
+check_answer enqueues its row and returns; a background thread writes the
+rows in batches (one executemany per batch, together with the matching
+user_topic_stats increments) when the batch is full or the flush interval
+has passed.
+A batch the database rejects (IntegrityError) is retried row by row and the
+rows that still fail are moved to a bounded dead-letter list, so one bad row
+cannot block the rows behind it. While the database is unreachable the
+queue keeps at most max_queue rows and drops the oldest beyond that.
+"""
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from config import (
+    RESPONSE_BUFFER_DEAD_LETTER_SIZE,
+    RESPONSE_BUFFER_FLUSH_SECONDS,
+    RESPONSE_BUFFER_MAX_BATCH,
+    RESPONSE_BUFFER_MAX_QUEUE,
+)
+from database import engine
+from models import UserQuestionResponse
+from topic_stats import apply_topic_stats
+
+
+class ResponseWriteBuffer:
+    """Collects response rows in memory and flushes them in batches"""
+
+    def __init__(self, max_batch: int, flush_interval: float, max_queue: int, dead_letter_size: int):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.flushed_total = 0
+        self.failed_batches = 0
+        self.dropped_total = 0
+        self.dead_lettered_total = 0
+        self.last_flush_at: Optional[float] = None
+        self.dead_letter: deque = deque(maxlen=dead_letter_size)
+        self._rows: List[dict] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: dict) -> None:
+        with self._cond:
+            self._rows.append(row)
+            self._trim()
+            if len(self._rows) >= self.max_batch:
+                self._cond.notify()
+
+    def _trim(self) -> None:
+        """Drop the oldest rows beyond max_queue (caller holds _cond)"""
+        overflow = len(self._rows) - self.max_queue
+        if overflow > 0:
+            del self._rows[:overflow]
+            self.dropped_total += overflow
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="response-write-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and drain everything that is still queued"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Write all queued rows; returns the number of rows written"""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+                written = len(rows)
+            except IntegrityError as e:
+                self.failed_batches += 1
+                print(f"⚠️  Response buffer batch rejected ({len(rows)} rows), retrying row by row: {e.orig}")
+                written = self._write_each(rows)
+            except Exception as e:
+                self._requeue(rows)
+                self.failed_batches += 1
+                print(f"⚠️  Response buffer flush failed ({len(rows)} rows): {e}")
+                return 0
+            self.flushed_total += written
+            self.last_flush_at = time.time()
+            return written
+
+    @staticmethod
+    def _write(rows: List[dict]) -> None:
+        with engine.begin() as conn:
+            conn.execute(insert(UserQuestionResponse), rows)
+            apply_topic_stats(conn, rows)
+
+    def _write_each(self, rows: List[dict]) -> int:
+        """Write rows one transaction each; rows the database rejects go to the dead letter"""
+        written = 0
+        for i, row in enumerate(rows):
+            try:
+                self._write([row])
+            except IntegrityError as e:
+                self.dead_letter.append(row)
+                self.dead_lettered_total += 1
+                print(f"⚠️  Response row dead-lettered (user {row['user_id']}, question {row['question_id']}): {e.orig}")
+                continue
+            except Exception as e:
+                self._requeue(rows[i:])
+                print(f"⚠️  Response buffer flush failed ({len(rows) - i} rows): {e}")
+                break
+            written += 1
+        return written
+
+    def _requeue(self, rows: List[dict]) -> None:
+        """Put rows back in front so the next flush (or the shutdown drain) retries them"""
+        with self._cond:
+            self._rows[:0] = rows
+            self._trim()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "flushed_total": self.flushed_total,
+            "failed_batches": self.failed_batches,
+            "dropped_total": self.dropped_total,
+            "dead_lettered_total": self.dead_lettered_total,
+            "last_flush_at": self.last_flush_at,
+        }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._rows) < self.max_batch:
+                    self._cond.wait(timeout=self.flush_interval)
+                stopping = self._stopping
+            if stopping:
+                return
+            self.flush()
+
+
+response_buffer = ResponseWriteBuffer(
+    max_batch=RESPONSE_BUFFER_MAX_BATCH,
+    flush_interval=RESPONSE_BUFFER_FLUSH_SECONDS,
+    max_queue=RESPONSE_BUFFER_MAX_QUEUE,
+    dead_letter_size=RESPONSE_BUFFER_DEAD_LETTER_SIZE,
+)
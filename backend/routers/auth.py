@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from datetime import timedelta
 from typing import Optional
 
-from database import get_db
+from database import get_async_db
 from models import User
-from auth import verify_password, get_password_hash, create_access_token, decode_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from dependencies import get_current_user, oauth2_scheme
+from auth import create_access_token, decode_access_token, password_hasher, PasswordHasherBusy, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import PASSWORD_HASH_RETRY_AFTER_SECONDS
+from dependencies import Principal, get_current_user, oauth2_scheme
 from jose import JWTError
 
 router = APIRouter(tags=["auth"])
@@ -37,40 +39,64 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+def hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Te veel aanmeldingen tegelijk, probeer het zo opnieuw",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
 # Endpoints
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (await db.execute(select(User.id).where(User.email == user_data.email))).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
+    # Hash on the dedicated password pool
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy:
+        raise hasher_busy_exception()
+    
     # Create new user
     new_user = User(
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=hashed_password,
         role=user_data.role,
         is_active=True
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     
     return new_user
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Login with email and password, returns JWT token"""
     # Find user by email
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = (await db.execute(select(User).where(User.email == login_data.email))).scalars().first()
+    
+    # Verify on the dedicated password pool
+    password_ok = False
+    if user:
+        try:
+            password_ok, new_hash = await password_hasher.verify_and_update(login_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise hasher_busy_exception()
+        if password_ok and new_hash:
+            # Hashing parameters changed since this hash was made
+            user.hashed_password = new_hash
+            await db.commit()
     
     # Verify user exists and password is correct
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -103,6 +129,6 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     """Get current authenticated user info"""
     return current_user
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from pydantic import BaseModel
-from database import get_db
-from models import ExamQuestionItem, User
-from dependencies import get_current_user
+from database import get_async_db
+from images import image_sources
+from models import ExamQuestionItem
+from dependencies import Principal, get_current_user
 import random
 
 router = APIRouter()
@@ -21,10 +24,10 @@ class ChatResponse(BaseModel):
     artifact: Optional[ChatArtifact] = None
 
 @router.post("/student/chat", response_model=ChatResponse)
-def chat_with_tutor(
+async def chat_with_tutor(
     request: ChatRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     msg = request.message.lower()
     
@@ -36,17 +39,20 @@ def chat_with_tutor(
     if keywords:
         # Construct dynamic filter
         # For MVP, just search description or topic
-        query = db.query(ExamQuestionItem)
+        # Answers are loaded with the matches; the async session never lazy-loads
+        query = select(ExamQuestionItem).options(
+            selectinload(ExamQuestionItem.answers), selectinload(ExamQuestionItem.image_renditions)
+        )
         # Search for ANY keyword match (very basic)
         matches = []
         for kw in keywords:
             params = f"%{kw}%"
-            found = query.filter(
-                (ExamQuestionItem.question_text.ilike(params)) | 
-                (ExamQuestionItem.cbr_topic.ilike(params)) |
-                (ExamQuestionItem.cbr_subtopic.ilike(params))
-            ).limit(5).all()
-            matches.extend(found)
+            result = await db.execute(query.where(or_(
+                ExamQuestionItem.question_text.ilike(params),
+                ExamQuestionItem.cbr_topic.ilike(params),
+                ExamQuestionItem.cbr_subtopic.ilike(params)
+            )).limit(5))
+            matches.extend(result.scalars().all())
         
         if matches:
             relevant_q = random.choice(matches)
@@ -61,6 +67,11 @@ def chat_with_tutor(
             "id": relevant_q.id,
             "question_text": relevant_q.question_text,
             "question_image": relevant_q.question_image,
+            "image_sources": image_sources(relevant_q.image_renditions),
+            "image_width": relevant_q.image_width,
+            "image_height": relevant_q.image_height,
+            "image_color": relevant_q.image_color,
+            "image_placeholder": relevant_q.image_placeholder,
             "question_type": relevant_q.question_type,
             # We don't send answers here to keep it "quiz mode", frontend handles fetching or we assume simple display?
             # Actually, let's just send the text/image and ask user to go to quiz?
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
-from models import User, Course, CourseModule, CourseLesson
-from dependencies import get_current_user
+from database import get_async_db, get_read_db
+from models import Course, CourseModule, CourseLesson
+from dependencies import Principal, get_current_user
+from http_cache import etag_matches, make_etag, not_modified, set_cache_headers
 
 router = APIRouter(tags=["courses"])
 
@@ -91,13 +94,31 @@ class CourseDetailResponse(CourseListResponse):
     modules: List[ModuleResponse] = []
 
 
+# ==================== LOADING HELPERS ====================
+
+# Modules and lessons are loaded up front; the async session never lazy-loads
+COURSE_DETAIL_OPTIONS = (
+    selectinload(Course.modules).selectinload(CourseModule.lessons),
+)
+
+async def load_course(db: AsyncSession, course_id: int) -> Optional[Course]:
+    """Load a course with its modules and lessons eagerly (refreshing any stale instance)"""
+    result = await db.execute(
+        select(Course)
+        .options(*COURSE_DETAIL_OPTIONS)
+        .where(Course.id == course_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
 # ==================== ENDPOINTS ====================
 
 @router.post("", response_model=CourseDetailResponse, status_code=status.HTTP_201_CREATED)
-def create_course(
+async def create_course(
     course_data: CourseCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new course with modules and lessons (Admin Only)"""
     if current_user.role != "admin":
@@ -111,7 +132,7 @@ def create_course(
         is_published=course_data.is_published
     )
     db.add(new_course)
-    db.flush() # Get ID
+    await db.flush() # Get ID
     
     # Create Modules & Lessons
     for m_data in course_data.modules:
@@ -121,7 +142,7 @@ def create_course(
             order=m_data.order
         )
         db.add(new_module)
-        db.flush() # Get ID
+        await db.flush() # Get ID
         
         for l_data in m_data.lessons:
             new_lesson = CourseLesson(
@@ -134,49 +155,72 @@ def create_course(
             )
             db.add(new_lesson)
             
-    db.commit()
-    db.refresh(new_course)
-    return new_course
+    await db.commit()
+    return await load_course(db, new_course.id)
 
 @router.get("", response_model=List[CourseListResponse])
-def list_courses(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)  
+async def list_courses(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)  
 ):
     """List all courses (Admin: all, Student: published only)"""
-    if current_user.role == "admin":
-        return db.query(Course).order_by(Course.created_at.desc()).all()
-    else:
-        return db.query(Course).filter(Course.is_published == True).order_by(Course.created_at.desc()).all()
+    query = select(*(getattr(Course, field) for field in CourseListResponse.model_fields))\
+        .order_by(Course.created_at.desc())
+    if current_user.role != "admin":
+        query = query.where(Course.is_published == True)
+    result = await db.execute(query)
+    rows = result.all()
+    # The rows are the whole body, so hashing them is the content version
+    etag = make_etag("courses", current_user.role == "admin", [tuple(row) for row in rows])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return rows
 
 @router.get("/{course_id}", response_model=CourseDetailResponse)
-def get_course(
+async def get_course(
     course_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get full course details"""
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
+    # Version check first: a revalidation costs one row lookup, not the module/lesson tree
+    result = await db.execute(
+        select(Course.is_published, Course.created_at, Course.updated_at).where(Course.id == course_id)
+    )
+    version = result.first()
+    if not version:
         raise HTTPException(status_code=404, detail="Course not found")
         
-    if not course.is_published and current_user.role != "admin":
+    if not version.is_published and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Course not available")
-        
+    
+    etag = make_etag("course", course_id, tuple(version))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    course = await load_course(db, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    set_cache_headers(response, etag)
     return course
 
 @router.put("/{course_id}", response_model=CourseDetailResponse)
-def update_course(
+async def update_course(
     course_id: int,
     course_data: CourseUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update course, modules, and lessons (Admin Only)"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update courses")
         
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await load_course(db, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
@@ -196,7 +240,7 @@ def update_course(
         # Delete removed modules
         for m_id, mod in existing_modules.items():
             if m_id not in submitted_mod_ids:
-                db.delete(mod)
+                await db.delete(mod)
                 
         # Update/Create Modules
         for m_data in course_data.modules:
@@ -212,7 +256,7 @@ def update_course(
                 
                 for l_id, lesson in existing_lessons.items():
                     if l_id not in submitted_lesson_ids:
-                        db.delete(lesson)
+                        await db.delete(lesson)
                         
                 for l_data in m_data.lessons:
                     if l_data.id and l_data.id in existing_lessons:
@@ -242,7 +286,7 @@ def update_course(
                     order=m_data.order
                 )
                 db.add(new_mod)
-                db.flush()
+                await db.flush()
                 
                 # Create Lessons in new Module
                 for l_data in m_data.lessons:
@@ -256,23 +300,24 @@ def update_course(
                     )
                     db.add(new_lesson)
     
-    db.commit()
-    db.refresh(course)
-    return course
+    # Module and lesson edits do not touch the course row; bump it so get_course's ETag changes
+    course.updated_at = datetime.utcnow()
+    await db.commit()
+    return await load_course(db, course_id)
 
 @router.delete("/{course_id}", status_code=204)
-def delete_course(
+async def delete_course(
     course_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can delete courses")
         
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await load_course(db, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
         
-    db.delete(course)
-    db.commit()
+    await db.delete(course)
+    await db.commit()
     return None
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
-from sqlalchemy import func, case
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel, Field, computed_field
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 
-from database import get_db
-from models import Exam, ExamQuestionItem, ExamAnswerOption, User, UserQuestionResponse, UserExamAttempt
-from dependencies import get_current_user
+from database import get_async_db, get_read_db
+from models import Exam, ExamQuestionItem, ExamAnswerOption, UserQuestionResponse, UserExamAttempt, UserTopicStat, exam_questions_association
+from dependencies import Principal, get_current_user
+from pagination import decode_cursor, encode_cursor, keyset_before, set_next_cursor
+from exam_cache import AnswerKey, exam_snapshots, answer_keys, topic_pools
+from json_responses import raw_json_response
+from images import image_sources
+from http_cache import cache_headers, etag_matches, make_etag, not_modified, set_cache_headers
+from exam_changes import compute_changeset, apply_changeset
+from response_buffer import response_buffer
+from topic_stats import apply_topic_stats
 
 router = APIRouter(tags=["exams"])
 
@@ -43,7 +51,34 @@ class ExamQuestionCreate(BaseModel):
     order: int = 0
     answers: List[ExamAnswerCreate]
 
-class ExamQuestionResponse(BaseModel):
+class ImageRenditionRef(BaseModel):
+    format: str
+    width: int
+    path: str
+    
+    class Config:
+        from_attributes = True
+
+class ImageSource(BaseModel):
+    type: str  # MIME type, for <source type=...>
+    srcset: str  # "<url> 320w, <url> 640w"
+
+class QuestionImageMixin(BaseModel):
+    # Preview computed at import: lets the client reserve layout space and
+    # paint the placeholder before the image arrives
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    image_color: Optional[str] = None
+    image_placeholder: Optional[str] = None
+    # Read from the eagerly loaded renditions; only the srcset view is sent
+    image_renditions: List[ImageRenditionRef] = Field(default=[], exclude=True)
+
+    @computed_field
+    @property
+    def image_sources(self) -> List[ImageSource]:
+        return [ImageSource(**source) for source in image_sources(self.image_renditions)]
+
+class ExamQuestionResponse(QuestionImageMixin):
     id: int
     question_text: str
     question_image: Optional[str]
@@ -124,7 +159,7 @@ class StudentAnswerResponse(BaseModel):
     class Config:
         from_attributes = True
 
-class StudentQuestionResponse(BaseModel):
+class StudentQuestionResponse(QuestionImageMixin):
     id: int
     question_text: str
     question_image: Optional[str]
@@ -171,6 +206,11 @@ class ExamListItem(BaseModel):
     class Config:
         from_attributes = True
 
+class AdminExamListItem(ExamListItem):
+    """List item with question count and per-CBR-topic breakdown"""
+    question_count: int = 0
+    topic_breakdown: Dict[str, int] = {}
+
 class ExamHistoryItem(BaseModel):
     id: int
     exam_title: str
@@ -186,56 +226,186 @@ class ExamFinishRequest(BaseModel):
     score: int
     total: int
 
+class ExamSubmitRequest(BaseModel):
+    answers: List[CheckAnswerRequest]
+
+class ExamSubmitResult(CheckAnswerResponse):
+    question_id: int
+
+class ExamSubmitResponse(BaseModel):
+    attempt_id: int
+    score: int
+    total: int
+    is_passed: bool
+    results: List[ExamSubmitResult]
+
+# ==================== LOADING HELPERS ====================
+
+# Every read path that serializes questions + answers uses this, so an exam
+# always costs three SELECTs (exam, questions in link order, answers) and
+# nothing is left to lazy-load on the async session.
+EXAM_DETAIL_OPTIONS = (
+    selectinload(Exam.questions).selectinload(ExamQuestionItem.answers),
+    selectinload(Exam.questions).selectinload(ExamQuestionItem.image_renditions),
+)
+
+async def load_exam(db: AsyncSession, exam_id: int, *criteria) -> Optional[Exam]:
+    """Load an exam with its questions and answers eagerly (refreshing any stale instance)"""
+    result = await db.execute(
+        select(Exam)
+        .options(*EXAM_DETAIL_OPTIONS)
+        .where(Exam.id == exam_id, *criteria)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def link_questions(db: AsyncSession, exam_id: int, question_ids: List[int]) -> None:
+    """Link questions to an exam in one multi-row insert, keeping the given order"""
+    if question_ids:
+        await db.execute(exam_questions_association.insert().values([
+            {"exam_id": exam_id, "question_id": q_id, "order": idx}
+            for idx, q_id in enumerate(question_ids)
+        ]))
+
+# ==================== CACHE HELPERS ====================
+
+async def touch_exams(db: AsyncSession, exam_id: int, question_ids=()) -> None:
+    """
+    Bump updated_at of an exam and every published exam sharing the given
+    questions, in one UPDATE. Question edits do not touch the exam rows
+    themselves, but updated_at is the source cached payloads are checked
+    against, so the shared exams' snapshots miss on their next request.
+    """
+    touched = Exam.id == exam_id
+    if question_ids:
+        link = exam_questions_association
+        sharing = select(link.c.exam_id).where(link.c.question_id.in_(list(question_ids)))
+        touched = touched | (Exam.id.in_(sharing) & (Exam.is_published == True))
+    await db.execute(
+        update(Exam).where(touched).values(updated_at=datetime.utcnow()).execution_options(synchronize_session=False)
+    )
+
+async def published_exam_source(db: AsyncSession, exam_id: int) -> Optional[tuple]:
+    """(created_at, updated_at) of a published exam, or None; cached payloads are only served for their own source"""
+    result = await db.execute(
+        select(Exam.created_at, Exam.updated_at).where(Exam.id == exam_id, Exam.is_published == True)
+    )
+    row = result.first()
+    return tuple(row) if row else None
+
+async def published_exam_reader(db: AsyncSession, primary: AsyncSession, exam_id: int) -> Tuple[AsyncSession, Optional[tuple]]:
+    """
+    (session, source) to serve a published exam from: the read session, or the
+    primary when the replica does not have the exam yet (a simulation exam
+    generated a moment ago). A lagging replica can serve an older payload,
+    but only under its own source, so it is rebuilt once the replica catches up.
+    """
+    source = await published_exam_source(db, exam_id)
+    if source is None and primary.bind is not db.bind:
+        db = primary
+        source = await published_exam_source(db, exam_id)
+    return db, source
+
+def exam_source(exam: Exam) -> tuple:
+    return (exam.created_at, exam.updated_at)
+
+def student_start_payload(exam: Exam) -> bytes:
+    """start_exam body for a fully loaded exam; the Pydantic schema filters out the correct answers"""
+    return StudentExamStartResponse.model_validate(exam).model_dump_json().encode()
+
+# ==================== GRADING HELPERS ====================
+
+def is_exam_passed(passing_score: Optional[int], score: int, total: int) -> bool:
+    """Default passing score 86% if not set"""
+    required_pct = passing_score or 86
+    user_pct = (score / total * 100) if total > 0 else 0
+    return user_pct >= required_pct
+
+async def get_answer_keys(db: AsyncSession, selected: Dict[int, Optional[int]]) -> Dict[int, AnswerKey]:
+    """
+    Answer keys for {question_id: selected_option_id}. Keys that are missing or
+    do not know the selected option are reloaded first: the question may have
+    been changed outside this process. Unknown questions are left out.
+    """
+    reload = [
+        q_id for q_id, option_id in selected.items()
+        if (key := answer_keys.get(q_id)) is None or not key.accepts_option(option_id)
+    ]
+    if reload:
+        await db.run_sync(answer_keys.refresh, reload)
+    keys = {q_id: answer_keys.get(q_id, allow_stale=True) for q_id in selected}
+    return {q_id: key for q_id, key in keys.items() if key is not None}
+
+def answer_explanation(key, is_correct: bool) -> Optional[str]:
+    """Manual explanation, or a generated hint for wrong answers"""
+    explanation_text = key.explanation
+    if not explanation_text and not is_correct:
+         # Fallback / "AI" stub
+         explanation_text = f"Het juiste antwoord is '{key.correct_text}'. {key.cbr_subtopic or ''}"
+    return explanation_text
+
 # ==================== STUDENT ENDPOINTS ====================
 
 @router.get("/student/history", response_model=List[ExamHistoryItem])
-def get_student_history(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_student_history(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get recent exam attempts for the student"""
-    attempts = db.query(UserExamAttempt).filter(
+    """Get exam attempts for the student, newest first (pass X-Next-Cursor as ?cursor= for the next page)"""
+    query = select(
+        UserExamAttempt.id,
+        UserExamAttempt.score,
+        UserExamAttempt.total_questions,
+        UserExamAttempt.is_passed,
+        UserExamAttempt.completed_at,
+        Exam.title,
+    ).outerjoin(Exam, Exam.id == UserExamAttempt.exam_id)\
+     .where(
         UserExamAttempt.user_id == current_user.id,
         UserExamAttempt.completed_at.isnot(None)
-    ).order_by(UserExamAttempt.completed_at.desc()).limit(10).all()
-    
-    # Enrich with Exam Title (as UserExamAttempt might not have relationship loaded or we need title from Exam)
-    # Actually, UserExamAttempt relates to Exam. Let's assume lazy loading works or join.
-    # We construct the response manually to be safe.
-    result = []
-    for a in attempts:
-        exam = db.query(Exam).get(a.exam_id)
-        result.append({
+    )
+    if cursor:
+        attempt_id, = decode_cursor(cursor, int)
+        query = query.where(keyset_before(UserExamAttempt.completed_at, UserExamAttempt.id, attempt_id))
+    
+    result = await db.execute(
+        query.order_by(UserExamAttempt.completed_at.desc(), UserExamAttempt.id.desc()).limit(limit + 1)
+    )
+    rows = result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        set_next_cursor(response, encode_cursor(rows[-1].id))
+    
+    return [
+        {
             "id": a.id,
-            "exam_title": exam.title if exam else "Verwijderd Examen",
+            "exam_title": a.title or "Verwijderd Examen",
             "score": a.score,
-            "max_score": 65, # Should be dynamic from questions count, currently attempt doesn't store max_score?
-            # Ideally UserExamAttempt should store max_score. For now we assume 65 or calculate.
-            # Wait, `finishExam` stores score. Does it store total?
-            # Let's check UserExamAttempt model.
+            "max_score": a.total_questions,
             "is_passed": a.is_passed,
             "completed_at": a.completed_at
-        })
-    return result
+        }
+        for a in rows
+    ]
 
 @router.post("/exams/{exam_id}/finish")
-def finish_exam(
+async def finish_exam(
     exam_id: int,
     data: ExamFinishRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Save exam result"""
     # Verify exam exists
-    exam = db.query(Exam).get(exam_id)
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
 
     # Determine pass/fail
-    # Default passing score 86% if not set
-    required_pct = exam.passing_score or 86
-    user_pct = (data.score / data.total * 100) if data.total > 0 else 0
-    is_passed = user_pct >= required_pct
+    is_passed = is_exam_passed(exam.passing_score, data.score, data.total)
 
     # Create attempt record
     attempt = UserExamAttempt(
@@ -247,47 +417,65 @@ def finish_exam(
         completed_at=datetime.utcnow()
     )
     db.add(attempt)
-    db.commit()
+    await db.commit()
     
     return {"message": "Exam result saved", "is_passed": is_passed}
 
 @router.get("/student/exams", response_model=List[ExamListItem])
-def list_student_exams(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def list_student_exams(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all published exams for students"""
-    exams = db.query(Exam).filter(Exam.is_published == True).order_by(Exam.created_at.desc()).all()
-    return exams
+    result = await db.execute(
+        select(*(getattr(Exam, field) for field in ExamListItem.model_fields))
+        .where(Exam.is_published == True)
+        .order_by(Exam.created_at.desc())
+    )
+    rows = result.all()
+    # The rows are the whole body, so hashing them is the content version
+    etag = make_etag("student_exams", [tuple(row) for row in rows])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return rows
 
 @router.get("/student/exams/{exam_id}/start", response_model=StudentExamStartResponse)
-def start_exam(
+async def start_exam(
     exam_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    primary: AsyncSession = Depends(get_async_db)
 ):
     """Start an exam - returns questions without correct answers"""
-    # Explicitly join questions to ensure they are loaded
-    exam = db.query(Exam)\
-        .options(joinedload(Exam.questions))\
-        .filter(Exam.id == exam_id, Exam.is_published == True)\
-        .first()
-        
-    if not exam:
+    # Serve the prebuilt payload when it was built from the exam as it is now
+    db, source = await published_exam_reader(db, primary, exam_id)
+    if source is None:
         raise HTTPException(status_code=404, detail="Examen niet gevonden of niet beschikbaar")
-        
-    # Ensure questions are ordered correctly if needed, though association table 'order' might need handling
-    # Pydantic schema will filter out correct answers if defined correctly
-    return exam
+    snapshot = exam_snapshots.get(exam_id, source)
+    if snapshot is None:
+        exam = await load_exam(db, exam_id, Exam.is_published == True)
+
+        if not exam:
+            raise HTTPException(status_code=404, detail="Examen niet gevonden of niet beschikbaar")
+
+        snapshot = exam_snapshots.put(exam_id, exam_source(exam), student_start_payload(exam))
+
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    return raw_json_response(snapshot.payload, headers=cache_headers(snapshot.etag))
 
 @router.delete("/student/exams/{exam_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_student_exam(
+async def delete_student_exam(
     exam_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a student's self-generated exam"""
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     
     if not exam:
         raise HTTPException(status_code=404, detail="Examen niet gevonden")
@@ -300,72 +488,137 @@ def delete_student_exam(
     if "CBR Simulatie" not in exam.title and exam.category != "CBR Simulatie":
          raise HTTPException(status_code=403, detail="Alleen simulatie-examens kunnen verwijderd worden")
 
-    db.delete(exam)
-    db.commit()
+    await db.delete(exam)
+    await db.commit()
+    exam_snapshots.invalidate(exam_id)
     return None
 
 @router.post("/student/exams/check-answer", response_model=CheckAnswerResponse)
-def check_answer(
+async def check_answer(
     request: CheckAnswerRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify an answer"""
-    question = db.query(ExamQuestionItem).filter(ExamQuestionItem.id == request.question_id).first()
-    if not question:
+    key = (await get_answer_keys(db, {request.question_id: request.selected_option_id})).get(request.question_id)
+    if key is None:
         raise HTTPException(status_code=404, detail="Vraag niet gevonden")
-    
-    is_correct = False
-    correct_text = "Geen antwoord tekst beschikbaar"
-    
-    # Logic based on type
-    if question.question_type == 'open_question':
-        # Find the correct answer option (there should be only one marked correct)
-        correct_option = next((a for a in question.answers if a.is_correct), None)
-        if correct_option:
-            correct_text = correct_option.answer_text
-            # Fuzzy compare (case insensitive, strip)
-            if request.answer_text and request.answer_text.strip().lower() == correct_option.answer_text.strip().lower():
-                is_correct = True
-    
-    else: # Multiple Choice or Drag Drop (both use Option Selection)
-        if request.selected_option_id:
-            selected_option = db.query(ExamAnswerOption).filter(ExamAnswerOption.id == request.selected_option_id).first()
-            if selected_option and selected_option.question_id == question.id and selected_option.is_correct:
-                is_correct = True
-        
-        # Get correct text for feedback
-        correct_option = next((a for a in question.answers if a.is_correct), None)
-        if correct_option:
-            correct_text = correct_option.answer_text
+    # The row is written later by the buffer; an unknown option id would be rejected there
+    if not key.accepts_option(request.selected_option_id):
+        raise HTTPException(status_code=400, detail="Ongeldige antwoordoptie")
 
-    # --- PROGRESS TRACKING: SAVE RESPONSE ---
-    # Find exam context via M2M if needed, or just save generic for now.
-    # We can infer exam_id from request if passed, but it's optional in model.
-    # Simplest: Just save the response.
-    
-    new_response = UserQuestionResponse(
-        user_id=current_user.id,
-        question_id=question.id,
-        is_correct=is_correct,
-        selected_answer_id=request.selected_option_id,
-        open_answer_text=request.answer_text
-    )
-    db.add(new_response)
-    db.commit()
+    is_correct = key.grade(request.selected_option_id, request.answer_text)
+    correct_text = key.correct_text
 
-    # Determine explanation
-    explanation_text = question.explanation
-    if not explanation_text and not is_correct:
-         # Fallback / "AI" stub
-         explanation_text = f"Het juiste antwoord is '{correct_text}'. {question.cbr_subtopic or ''}"
+    # --- PROGRESS TRACKING: SAVE RESPONSE ---
+    # Written behind in batches; the request does not wait for the commit.
+    response_buffer.add({
+        "user_id": current_user.id,
+        "question_id": key.question_id,
+        "is_correct": is_correct,
+        "selected_answer_id": request.selected_option_id,
+        "open_answer_text": request.answer_text,
+        "created_at": datetime.utcnow(),
+    })
 
     return {
         "is_correct": is_correct,
         "correct_answer_text": correct_text,
-        "explanation": explanation_text
+        "explanation": answer_explanation(key, is_correct)
     }
 
+@router.post("/student/exams/{exam_id}/submit", response_model=ExamSubmitResponse)
+async def submit_exam(
+    exam_id: int,
+    data: ExamSubmitRequest,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Grade a whole exam server-side and store all responses plus the attempt in one transaction"""
+    result = await db.execute(
+        select(Exam.id, Exam.passing_score).where(Exam.id == exam_id, Exam.is_published == True)
+    )
+    exam = result.first()
+    if not exam:
+        raise HTTPException(status_code=404, detail="Examen niet gevonden of niet beschikbaar")
+
+    result = await db.execute(
+        select(exam_questions_association.c.question_id)
+        .where(exam_questions_association.c.exam_id == exam_id)
+    )
+    question_ids = list(result.scalars())
+    exam_question_ids = set(question_ids)
+
+    # total counts every exam question, so an answer to another question would skew the score
+    foreign = sorted({a.question_id for a in data.answers} - exam_question_ids)
+    if foreign:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Vraag {', '.join(map(str, foreign))} hoort niet bij dit examen"
+        )
+
+    # One answer per question; later entries win
+    submitted = {a.question_id: a for a in data.answers}
+
+    keys = await get_answer_keys(db, {q_id: a.selected_option_id for q_id, a in submitted.items()})
+    # Checked before anything is written: an unknown option id would fail the insert
+    invalid = sorted(q_id for q_id, key in keys.items() if not key.accepts_option(submitted[q_id].selected_option_id))
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ongeldige antwoordoptie bij vraag {', '.join(map(str, invalid))}"
+        )
+
+    score = 0
+    results = []
+    response_rows = []
+    for q_id, answer in submitted.items():
+        key = keys.get(q_id)
+        if key is None:
+            continue
+        is_correct = key.grade(answer.selected_option_id, answer.answer_text)
+        score += is_correct
+        results.append(ExamSubmitResult(
+            question_id=q_id,
+            is_correct=is_correct,
+            correct_answer_text=key.correct_text,
+            explanation=answer_explanation(key, is_correct)
+        ))
+        response_rows.append({
+            "user_id": current_user.id,
+            "question_id": q_id,
+            "exam_id": exam_id,
+            "is_correct": is_correct,
+            "selected_answer_id": answer.selected_option_id,
+            "open_answer_text": answer.answer_text,
+        })
+
+    total = len(question_ids)
+    is_passed = is_exam_passed(exam.passing_score, score, total)
+
+    if response_rows:
+        await db.execute(insert(UserQuestionResponse).values(response_rows))
+        conn = await db.connection()
+        await conn.run_sync(apply_topic_stats, response_rows)
+    attempt = UserExamAttempt(
+        user_id=current_user.id,
+        exam_id=exam_id,
+        score=score,
+        total_questions=total,
+        is_passed=is_passed,
+        completed_at=datetime.utcnow()
+    )
+    db.add(attempt)
+    await db.commit()
+
+    return ExamSubmitResponse(
+        attempt_id=attempt.id,
+        score=score,
+        total=total,
+        is_passed=is_passed,
+        results=results
+    )
+
 class TopicProgress(BaseModel):
     topic: str
     total_answered: int
@@ -373,34 +626,30 @@ class TopicProgress(BaseModel):
     percentage: int
 
 import random
-from models import exam_questions_association
+
+# (topic pool, number of questions) in the order they appear in a CBR exam
+CBR_SIMULATION_MIX = (("Gevaarherkenning", 25), ("Kennis", 12), ("Inzicht", 28))
 
 @router.post("/student/exams/cbr-simulation", response_model=ExamResponse)
-def create_cbr_exam(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def create_cbr_exam(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate a CBR-style simulated exam"""
     
-    # 1. Fetch Question IDs by Category
-    gh_ids = [q.id for q in db.query(ExamQuestionItem.id).filter(ExamQuestionItem.cbr_topic == 'Gevaarherkenning').all()]
-    kn_ids = [q.id for q in db.query(ExamQuestionItem.id).filter(ExamQuestionItem.cbr_topic == 'Kennis').all()]
-    in_ids = [q.id for q in db.query(ExamQuestionItem.id).filter(ExamQuestionItem.cbr_topic.notin_(['Gevaarherkenning', 'Kennis'])).all()]
+    # 1. Question ID pools by category (cached, refreshed when the bank changes)
+    pools = await db.run_sync(topic_pools.get)
     
     # 2. Select with fallback (Sampling with replacement if not enough data)
-    # Gevaarherkenning: Need 25
-    if not gh_ids: gh_exam = [] # Handle empty case gracefully (?) or error. 
-    else: gh_exam = random.choices(gh_ids, k=25) if len(gh_ids) < 25 else random.sample(gh_ids, k=25)
-
-    # Kennis: Need 12
-    if not kn_ids: kn_exam = []
-    else: kn_exam = random.choices(kn_ids, k=12) if len(kn_ids) < 12 else random.sample(kn_ids, k=12)
+    selected = []
+    for topic, needed in CBR_SIMULATION_MIX:
+        ids = pools[topic]
+        if not ids:
+            continue
+        selected += random.choices(ids, k=needed) if len(ids) < needed else random.sample(ids, k=needed)
 
-    # Inzicht: Need 28
-    if not in_ids: in_exam = [] 
-    else: in_exam = random.choices(in_ids, k=28) if len(in_ids) < 28 else random.sample(in_ids, k=28)
-
-    all_ids = gh_exam + kn_exam + in_exam
+    # A question can only be linked once per exam (sampling with replacement may repeat it)
+    all_ids = list(dict.fromkeys(selected))
 
     if not all_ids:
         raise HTTPException(status_code=400, detail="Niet genoeg vragen in de database om een examen te genereren.")
@@ -416,47 +665,36 @@ def create_cbr_exam(
         created_by=current_user.id
     )
     db.add(new_exam)
-    db.commit()
-    db.refresh(new_exam)
-
-    # 4. Link Questions (Manual M2M insert for order)
-    # We iterate and insert to preserve the specific generated order (GH -> KN -> IN)
-    for idx, q_id in enumerate(all_ids):
-        stmt = exam_questions_association.insert().values(
-            exam_id=new_exam.id,
-            question_id=q_id,
-            order=idx
-        )
-        db.execute(stmt)
+    await db.flush()  # Get exam ID
+
+    # 4. Link Questions in one multi-row insert, preserving the generated order (GH -> KN -> IN)
+    await link_questions(db, new_exam.id, all_ids)
     
-    db.commit()
+    await db.commit()
     
-    return new_exam
+    return await load_exam(db, new_exam.id)
 
 @router.get("/student/progress", response_model=List[TopicProgress])
-def get_student_progress(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_student_progress(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Calculate progress per CBR topic based on UserQuestionResponses"""
-    # Group by Topic
-    results = db.query(
-        ExamQuestionItem.cbr_topic,
-        func.count(UserQuestionResponse.id).label('total'),
-        func.sum(case((UserQuestionResponse.is_correct == True, 1), else_=0)).label('correct')
-    ).join(ExamQuestionItem, UserQuestionResponse.question_id == ExamQuestionItem.id)\
-     .filter(UserQuestionResponse.user_id == current_user.id)\
-     .group_by(ExamQuestionItem.cbr_topic).all()
+    """Progress per CBR topic from the incrementally maintained user_topic_stats"""
+    result = await db.execute(
+        select(UserTopicStat)
+        .where(UserTopicStat.user_id == current_user.id)
+        .order_by(UserTopicStat.cbr_topic)
+    )
+    stats = result.scalars().all()
     
     progress_list = []
-    for topic_name, total, correct in results:
-        if not topic_name: continue
-        total = total or 0
-        correct = correct or 0
+    for stat in stats:
+        total = stat.answered or 0
+        correct = stat.correct or 0
         pct = int((correct / total) * 100) if total > 0 else 0
         
         progress_list.append(TopicProgress(
-            topic=topic_name,
+            topic=stat.cbr_topic,
             total_answered=total,
             total_correct=correct,
             percentage=pct
@@ -467,10 +705,10 @@ def get_student_progress(
 # ==================== ADMIN ENDPOINTS ====================
 
 @router.post("/admin/exams", response_model=ExamResponse, status_code=status.HTTP_201_CREATED)
-def create_exam(
+async def create_exam(
     exam_data: ExamCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new exam (admin only)"""
     # Check if user is admin
@@ -494,7 +732,7 @@ def create_exam(
     )
     
     db.add(new_exam)
-    db.flush()  # Get exam ID
+    await db.flush()  # Get exam ID
     
     # Add questions and answers
     question_items = []
@@ -521,34 +759,84 @@ def create_exam(
         
         question_items.append(question)
     
-    # Link questions to exam via M2M relationship
-    new_exam.questions = question_items
+    db.add_all(question_items)
+    await db.flush()  # Get question IDs
+    question_ids = [q.id for q in question_items]
+    
+    # Link questions to exam in submitted order
+    await link_questions(db, new_exam.id, question_ids)
     
-    db.commit()
-    db.refresh(new_exam)
+    await db.commit()
+    await db.run_sync(answer_keys.refresh, question_ids)
+    topic_pools.invalidate()
     
-    return new_exam
+    return await load_exam(db, new_exam.id)
 
-@router.get("/admin/exams", response_model=List[ExamListItem])
-def list_all_exams(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/admin/exams", response_model=List[AdminExamListItem])
+async def list_all_exams(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    is_published: Optional[bool] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all exams including drafts (admin only)"""
+    """
+    List all exams including drafts, newest first, with question counts (admin only).
+    Returns every exam unless a limit is given; pages continue with X-Next-Cursor as ?cursor=.
+    """
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can view all exams"
         )
     
-    exams = db.query(Exam).order_by(Exam.created_at.desc()).all()
-    return exams
+    query = select(Exam)
+    if category is not None:
+        query = query.where(Exam.category == category)
+    if is_published is not None:
+        query = query.where(Exam.is_published == is_published)
+    if cursor:
+        last_id, = decode_cursor(cursor, int)
+        query = query.where(keyset_before(Exam.created_at, Exam.id, last_id))
+    
+    query = query.order_by(Exam.created_at.desc(), Exam.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    result = await db.execute(query)
+    exams = result.scalars().all()
+    if limit is not None and len(exams) > limit:
+        exams = exams[:limit]
+        set_next_cursor(response, encode_cursor(exams[-1].id))
+    
+    # Question counts per exam and topic for this page, in one GROUP BY
+    breakdowns: Dict[int, Dict[str, int]] = {exam.id: {} for exam in exams}
+    if exams:
+        link = exam_questions_association
+        rows = await db.execute(
+            select(link.c.exam_id, ExamQuestionItem.cbr_topic, func.count())
+            .join(ExamQuestionItem, ExamQuestionItem.id == link.c.question_id)
+            .where(link.c.exam_id.in_(list(breakdowns)))
+            .group_by(link.c.exam_id, ExamQuestionItem.cbr_topic)
+        )
+        for exam_id, topic, count in rows:
+            breakdowns[exam_id][topic or "Onbekend"] = count
+    
+    return [
+        AdminExamListItem(
+            **ExamListItem.model_validate(exam).model_dump(),
+            question_count=sum(breakdowns[exam.id].values()),
+            topic_breakdown=breakdowns[exam.id]
+        )
+        for exam in exams
+    ]
 
 @router.get("/admin/exams/{exam_id}", response_model=ExamResponse)
-def get_exam_detail(
+async def get_exam_detail(
     exam_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get exam details with questions (admin only)"""
     if current_user.role != "admin":
@@ -557,7 +845,7 @@ def get_exam_detail(
             detail="Only admins can view exam details"
         )
     
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await load_exam(db, exam_id)
     if not exam:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -567,11 +855,11 @@ def get_exam_detail(
     return exam
 
 @router.put("/admin/exams/{exam_id}", response_model=ExamResponse)
-def update_exam(
+async def update_exam(
     exam_id: int,
     exam_data: ExamUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update exam settings (admin only)"""
     if current_user.role != "admin":
@@ -580,119 +868,49 @@ def update_exam(
             detail="Only admins can update exams"
         )
     
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await load_exam(db, exam_id)
     if not exam:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Exam not found"
         )
     
-    # Update exam fields
-    update_data = exam_data.dict(exclude_unset=True)
+    # Update exam fields (only the ones that actually change)
+    update_data = exam_data.model_dump(exclude_unset=True)
     exam_fields = ["title", "description", "cover_image", "time_limit", "passing_score", "category", "is_published"]
     for field in exam_fields:
-        if field in update_data:
+        if field in update_data and getattr(exam, field) != update_data[field]:
             setattr(exam, field, update_data[field])
     
-    # Update questions if provided
+    # Update questions if provided, as a changeset applied with bulk statements
+    changes = None
     if exam_data.questions is not None:
-        # Get existing questions map {id: question_obj}
-        existing_questions = {q.id: q for q in exam.questions}
-        submitted_question_ids = [q.id for q in exam_data.questions if q.id is not None]
-        
-        # 1. Update or Create Questions
-        new_questions_list = []
-        
-        for q_data in exam_data.questions:
-            if q_data.id and q_data.id in existing_questions:
-                # Update existing question
-                question = existing_questions[q_data.id]
-                question.question_text = q_data.question_text
-                question.question_image = q_data.question_image
-                question.question_type = q_data.question_type
-                question.cbr_topic = q_data.cbr_topic
-                question.cbr_subtopic = q_data.cbr_subtopic
-                question.explanation = q_data.explanation
-                # Note: 'order' is on the association table, handling that requires extra logic
-                # For now we ignore re-ordering complex logic and just focus on content
-                
-                # Update Answers for this question
-                existing_answers = {a.id: a for a in question.answers}
-                submitted_answer_ids = [a.id for a in q_data.answers if a.id is not None]
-                
-                # Delete removed answers
-                for a_id, answer in existing_answers.items():
-                    if a_id not in submitted_answer_ids:
-                        db.delete(answer)
-                
-                # Update/Create answers
-                for a_data in q_data.answers:
-                    if a_data.id and a_data.id in existing_answers:
-                        ans = existing_answers[a_data.id]
-                        ans.answer_text = a_data.answer_text
-                        ans.is_correct = a_data.is_correct
-                        ans.order = a_data.order
-                        ans.x_position = a_data.x_position
-                        ans.y_position = a_data.y_position
-                    else:
-                        new_ans = ExamAnswerOption(
-                            question_id=question.id,
-                            answer_text=a_data.answer_text,
-                            is_correct=a_data.is_correct,
-                            order=a_data.order,
-                            x_position=a_data.x_position,
-                            y_position=a_data.y_position
-                        )
-                        db.add(new_ans)
-                
-                new_questions_list.append(question)
-            else:
-                # Create new question
-                new_q = ExamQuestionItem(
-                    question_text=q_data.question_text,
-                    question_image=q_data.question_image,
-                    question_type=q_data.question_type,
-                    cbr_topic=q_data.cbr_topic,
-                    cbr_subtopic=q_data.cbr_subtopic,
-                    explanation=q_data.explanation
-                )
-                db.add(new_q)
-                db.flush() # Get ID
-                
-                # Add answers
-                for a_data in q_data.answers:
-                    new_ans = ExamAnswerOption(
-                        question_id=new_q.id,
-                        answer_text=a_data.answer_text,
-                        is_correct=a_data.is_correct,
-                        order=a_data.order,
-                        x_position=a_data.x_position,
-                        y_position=a_data.y_position
-                    )
-                    db.add(new_ans)
-                
-                new_questions_list.append(new_q)
-
-        # 2. Update relationship (this handles unlinking/deleting if configured)
-        # However, due to Many-to-Many complexity, simple assignment might just update links.
-        # But we want to DELETE questions that are removed from the exam (assuming they belong only to this exam)
-        # Since ExamQuestionItem is shared in theory but usually 1:1 in this app context:
-        exam.questions = new_questions_list
-        
-        # Cleanup: Delete questions that were removed and are not used elsewhere?
-        # For now, we rely on the exam.questions assignment. 
-        # CAUTION: If we want to strictly delete orphaned questions, we need to do it explicitly if they are not linked to other exams.
+        changes = await compute_changeset(db, exam, exam_data.questions)
+        if not changes.is_empty:
+            new_question_ids = await apply_changeset(db, exam_id, changes)
+            changed_ids = changes.changed_question_ids
+            await touch_exams(db, exam_id, changed_ids | set(changes.removed_question_ids))
     
-    db.commit()
-    db.refresh(exam)
+    if not db.dirty and (changes is None or changes.is_empty):
+        # Nothing changed: no writes, no cache invalidation
+        return exam
     
-    return exam
+    await db.commit()
+    
+    # Exams sharing the questions were touched too; their snapshots miss on the source check
+    exam_snapshots.invalidate(exam_id)
+    if changes is not None and not changes.is_empty:
+        await db.run_sync(answer_keys.refresh, changed_ids | set(new_question_ids))
+        if changes.inserted_questions or changes.updated_questions:
+            topic_pools.invalidate()
+    
+    return await load_exam(db, exam_id)
 
 @router.put("/admin/exams/{exam_id}/publish")
-def publish_exam(
+async def publish_exam(
     exam_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Publish exam - makes it visible to students"""
     if current_user.role != "admin":
@@ -701,7 +919,7 @@ def publish_exam(
             detail="Only admins can publish exams"
         )
     
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -712,19 +930,20 @@ def publish_exam(
     exam.is_published = True
     exam.published_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(exam)
+    await db.commit()
+    exam_snapshots.invalidate(exam_id)
+    exam = await load_exam(db, exam_id)
     
     return {
         "message": "Examen staat live voor studenten!",
-        "exam": ExamResponse.from_orm(exam)
+        "exam": ExamResponse.model_validate(exam)
     }
 
 @router.put("/admin/exams/{exam_id}/unpublish")
-def unpublish_exam(
+async def unpublish_exam(
     exam_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Unpublish exam - hides it from students"""
     if current_user.role != "admin":
@@ -733,7 +952,7 @@ def unpublish_exam(
             detail="Only admins can unpublish exams"
         )
     
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -743,7 +962,8 @@ def unpublish_exam(
     # Unpublish exam
     exam.is_published = False
     
-    db.commit()
+    await db.commit()
+    exam_snapshots.invalidate(exam_id)
     
     return {"message": "Examen is nu een concept"}
 
@@ -751,20 +971,32 @@ def unpublish_exam(
 
 
 @router.get("/student/exams/{exam_id}", response_model=ExamResponse)
-def get_student_exam_detail(
+async def get_student_exam_detail(
     exam_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    primary: AsyncSession = Depends(get_async_db)
 ):
     """Get published exam details for student"""
-    exam = db.query(Exam).filter(
-        Exam.id == exam_id,
-        Exam.is_published == True
-    ).first()
-    
-    if not exam:
+    db, source = await published_exam_reader(db, primary, exam_id)
+    if source is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Exam not found or not published"
         )
+    snapshot = exam_snapshots.get(exam_id, source, kind="detail")
+    if snapshot is None:
+        exam = await load_exam(db, exam_id, Exam.is_published == True)
+        
+        if not exam:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Exam not found or not published"
+            )
+        
+        payload = ExamResponse.model_validate(exam).model_dump_json().encode()
+        snapshot = exam_snapshots.put(exam_id, exam_source(exam), payload, kind="detail")
     
-    return exam
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    return raw_json_response(snapshot.payload, headers=cache_headers(snapshot.etag))
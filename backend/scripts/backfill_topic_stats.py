@@ -0,0 +1,24 @@
+"""
+Rebuild user_topic_stats from the full UserQuestionResponse history.
+Migration 0006 fills the table once on deploy; run this whenever the
+counters drift (e.g. after editing responses by hand):
+    python scripts/backfill_topic_stats.py
+Stop the API first; answers recorded during the rebuild would be lost from the counters.
+"""
+import sys
+import os
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from migrations import migrate
+from topic_stats import rebuild_topic_stats
+
+print("Rebuilding user topic stats...")
+# The schema is owned by migrations.py; bring it up to date (creates user_topic_stats)
+for migration in migrate(engine):
+    print(f"  ✅ Applied migration {migration.version:04d} {migration.name}")
+with engine.begin() as conn:
+    count = rebuild_topic_stats(conn)
+print(f"✅ Rebuilt {count} user/topic rows.")
@@ -0,0 +1,97 @@
+"""
+Serialization benchmark for the large read payloads.
+Builds a CBR-sized exam (65 questions x 4 answers) and a course in memory
+(no database) and times every way the API can turn them into JSON bytes:
+    python scripts/bench_serialization.py [iterations]
+"""
+import sys
+import os
+import json
+import time
+from datetime import datetime
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from models import Exam, ExamQuestionItem, ExamAnswerOption, Course, CourseModule, CourseLesson
+from routers.exams import ExamResponse, StudentExamStartResponse
+from routers.courses import CourseDetailResponse
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+
+def build_exam(n_questions: int = 65, n_answers: int = 4) -> Exam:
+    now = datetime.utcnow()
+    exam = Exam(id=1, title="CBR Examen", description="Proefexamen", time_limit=30, passing_score=86,
+                category="Theorie", is_published=True, created_at=now, updated_at=now, published_at=now)
+    for i in range(n_questions):
+        question = ExamQuestionItem(
+            id=i + 1, question_text=f"Wat is de juiste handeling in situatie {i}? " * 3,
+            question_image=f"/static/exam_images/q{i}.jpg", question_type="multiple_choice",
+            cbr_topic="Kennis", cbr_subtopic="Voorrang", explanation="Uitleg " * 10,
+        )
+        question.answers = [
+            ExamAnswerOption(id=i * n_answers + j + 1, answer_text=f"Antwoord {j}", is_correct=(j == 0), order=j)
+            for j in range(n_answers)
+        ]
+        exam.questions.append(question)
+    return exam
+
+
+def build_course(n_modules: int = 8, n_lessons: int = 6) -> Course:
+    course = Course(id=1, title="Theoriecursus", description="Alles voor het CBR", cover_image=None,
+                    is_published=True, created_at=datetime.utcnow())
+    for m in range(n_modules):
+        module = CourseModule(id=m + 1, title=f"Module {m}", order=m)
+        module.lessons = [
+            CourseLesson(id=m * n_lessons + l + 1, title=f"Les {l}", content="Tekst " * 200,
+                         video_url=None, duration_minutes=5, order=l)
+            for l in range(n_lessons)
+        ]
+        course.modules.append(module)
+    return course
+
+
+def stdlib_json(schema, obj) -> bytes:
+    # Generic JSONResponse path: validate, encode to a dict, json.dumps
+    return json.dumps(jsonable_encoder(schema.model_validate(obj))).encode()
+
+
+def orjson_dict(schema, obj) -> bytes:
+    # Default response class (OrjsonResponse): validate, JSON-mode dict, orjson
+    return orjson.dumps(schema.model_validate(obj).model_dump(mode="json"))
+
+
+def pydantic_json(schema, obj) -> bytes:
+    # Pydantic's own dump, used to build the cached snapshots
+    return schema.model_validate(obj).model_dump_json().encode()
+
+
+def bench(fn, *args) -> float:
+    fn(*args)
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(*args)
+    return (time.perf_counter() - started) / ITERATIONS * 1000
+
+
+exam = build_exam()
+course = build_course()
+cases = [
+    ("start_exam", StudentExamStartResponse, exam, True),
+    ("get_exam_detail", ExamResponse, exam, False),
+    ("get_course", CourseDetailResponse, course, False),
+]
+
+print(f"Serialization, ms per response ({ITERATIONS} iterations)\n")
+print(f"{'endpoint':<18}{'bytes':>8}{'json.dumps':>12}{'orjson':>10}{'pydantic':>10}{'cached':>10}")
+for name, schema, obj, cached in cases:
+    payload = pydantic_json(schema, obj)
+    assert json.loads(payload) == json.loads(stdlib_json(schema, obj))
+    timings = [bench(stdlib_json, schema, obj), bench(orjson_dict, schema, obj), bench(pydantic_json, schema, obj)]
+    # A snapshot hit sends the stored bytes as-is
+    cached_ms = f"{bench(bytes, payload):>10.3f}" if cached else f"{'-':>10}"
+    print(f"{name:<18}{len(payload):>8}" + "".join(f"{t:>{w}.3f}" for t, w in zip(timings, (12, 10, 10))) + cached_ms)
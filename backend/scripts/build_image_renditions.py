@@ -0,0 +1,100 @@
+"""
+Build the AVIF / WebP renditions of every question image (see images.py).
+Also stores the image preview (dimensions, dominant color, placeholder) on
+the question. Questions whose original has not changed since the last run
+are skipped.
+    python scripts/build_image_renditions.py           # new / changed images only
+    python scripts/build_image_renditions.py --force   # rebuild everything
+Running API workers keep serving their cached exam payloads; restart them
+afterwards so the new image_sources show up.
+"""
+import sys
+import os
+import time
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from database import SessionLocal
+from images import RENDITIONS_DIR, UNAVAILABLE_FORMATS, decode, image_preview, source_digest, static_file_path, store_renditions
+from models import ExamQuestionItem, QuestionImageRendition
+
+FORCE = "--force" in sys.argv
+COMMIT_EVERY = 50
+
+
+def is_current(question: ExamQuestionItem, digest: str) -> bool:
+    renditions = question.image_renditions
+    return bool(renditions) and question.image_placeholder is not None and all(
+        r.source_sha256 == digest and os.path.exists(os.path.join(RENDITIONS_DIR, os.path.basename(r.path)))
+        for r in renditions
+    )
+
+
+def main():
+    print("🖼️  Building question image renditions...")
+    if UNAVAILABLE_FORMATS:
+        print(f"  ⚠️  This Pillow build cannot encode {', '.join(UNAVAILABLE_FORMATS)}; skipping those renditions")
+    db = SessionLocal()
+    built = skipped = missing = 0
+    original_bytes = rendition_bytes = 0
+    started = time.perf_counter()
+    try:
+        questions = db.execute(
+            select(ExamQuestionItem)
+            .options(selectinload(ExamQuestionItem.image_renditions))
+            .where(ExamQuestionItem.question_image.isnot(None))
+            .order_by(ExamQuestionItem.id)
+        ).scalars().all()
+
+        for question in questions:
+            path = static_file_path(question.question_image)
+            if not path or not os.path.exists(path):
+                missing += 1
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = source_digest(data)
+            if not FORCE and is_current(question, digest):
+                skipped += 1
+                continue
+
+            errors = []
+            try:
+                image = decode(data)
+                renditions = store_renditions(image, errors)
+                preview = image_preview(image)
+            except Exception as e:
+                print(f"  ✗ Question {question.id} ({os.path.basename(path)}): {e}")
+                continue
+            if errors:
+                print(f"  ⚠️  Question {question.id} ({os.path.basename(path)}): skipped {'; '.join(errors)}")
+            question.image_width, question.image_height, question.image_color, question.image_placeholder = preview
+            question.image_renditions = [
+                QuestionImageRendition(source_sha256=digest, **r._asdict()) for r in renditions
+            ]
+
+            built += 1
+            original_bytes += len(data)
+            # What a browser downloads at most: the largest rendition of one format
+            largest = max(renditions, key=lambda r: (r.width, -r.byte_size))
+            rendition_bytes += largest.byte_size
+            if built % COMMIT_EVERY == 0:
+                db.commit()
+                print(f"  ✓ {built} images ({time.perf_counter() - started:.1f}s)")
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"✅ Built {built}, unchanged {skipped}, missing originals {missing} "
+          f"in {time.perf_counter() - started:.1f}s")
+    if built:
+        print(f"   Originals {original_bytes / 1e6:.1f} MB -> largest rendition "
+              f"{rendition_bytes / 1e6:.1f} MB ({rendition_bytes / original_bytes:.0%})")
+
+
+if __name__ == "__main__":
+    main()
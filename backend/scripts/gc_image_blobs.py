@@ -0,0 +1,81 @@
+"""
+Garbage-collect image blobs no question references (see image_store.py).
+A blob is kept while a question_images row or a question_image URL points at
+it. Blobs younger than --min-age-minutes are kept too, so an import running
+at the same time cannot lose images it has written but not linked yet.
+    python scripts/gc_image_blobs.py --dry-run
+    python scripts/gc_image_blobs.py [--min-age-minutes 60]
+"""
+import sys
+import os
+import re
+import time
+import argparse
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, select
+
+from database import SessionLocal
+from image_store import BLOBS_SUBDIR, blob_store
+from models import ExamQuestionItem, ImageBlob, QuestionImage
+
+BLOB_URL = re.compile(rf"/{BLOBS_SUBDIR}/[0-9a-f]{{2}}/(?P<sha256>[0-9a-f]{{64}})\.")
+
+
+def referenced_blobs(db) -> set:
+    referenced = set(db.execute(select(QuestionImage.blob_sha256)).scalars())
+    # Questions edited in the admin can point at a blob URL directly
+    for url in db.execute(
+        select(ExamQuestionItem.question_image).where(ExamQuestionItem.question_image.contains(f"/{BLOBS_SUBDIR}/"))
+    ).scalars():
+        match = BLOB_URL.search(url)
+        if match:
+            referenced.add(match.group("sha256"))
+    return referenced
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    parser.add_argument("--min-age-minutes", type=float, default=60)
+    args = parser.parse_args()
+
+    print("🧹 Collecting unreferenced image blobs...")
+    cutoff = time.time() - args.min_age_minutes * 60
+    db = SessionLocal()
+    try:
+        referenced = referenced_blobs(db)
+        removed, freed, kept_young = set(), 0, 0
+        on_disk = set()
+        for sha256, path in blob_store:
+            on_disk.add(sha256)
+            if sha256 in referenced:
+                continue
+            if os.path.getmtime(path) > cutoff:
+                kept_young += 1
+                continue
+            freed += os.path.getsize(path)
+            removed.add(sha256)
+            if not args.dry_run:
+                os.remove(path)
+
+        # Rows for removed blobs, and rows whose file is gone anyway
+        stale_rows = [
+            sha256 for sha256 in db.execute(select(ImageBlob.sha256)).scalars()
+            if sha256 not in referenced and (sha256 in removed or sha256 not in on_disk)
+        ]
+        if stale_rows and not args.dry_run:
+            db.execute(delete(ImageBlob).where(ImageBlob.sha256.in_(stale_rows)))
+            db.commit()
+    finally:
+        db.close()
+
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"✅ {verb} {len(removed)} blobs ({freed / 1e6:.1f} MB) and {len(stale_rows)} rows; "
+          f"{len(referenced)} referenced, {kept_young} unreferenced but younger than {args.min_age_minutes:g} min")
+
+
+if __name__ == "__main__":
+    main()
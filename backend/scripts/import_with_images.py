@@ -2,66 +2,193 @@
 Advanced Excel Import Script with Image Extraction
 Imports exam questions from TheorieToppers Excel file with embedded images
 """
+import hashlib
 import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from sqlalchemy import inspect, select
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
-from models import Base, Exam, ExamQuestionItem, ExamAnswerOption
+from config import IMAGE_RENDITION_WIDTHS, IMPORT_IMAGE_WORKERS, IMPORT_MAX_IN_FLIGHT
+from image_store import BlobStore, StoredBlob, blob_store
+from images import (
+    ENCODABLE_FORMATS, RENDITIONS_DIR, UNAVAILABLE_FORMATS, ImagePreview, IngestedImage, RenditionFile,
+    ingest_image, target_widths,
+)
+from models import Base, Exam, ExamQuestionItem, ExamAnswerOption, ImageBlob, QuestionImage, QuestionImageRendition
 import openpyxl
 from openpyxl.drawing.image import Image as OpenpyxlImage
 
+# Image URLs are stored absolute; the frontend uses them as-is
+IMAGE_BASE_URL = "http://localhost:8000"
 
-def create_static_folder():
-    """Create static/images folder if it doesn't exist"""
-    static_dir = Path(__file__).parent.parent / "static" / "images"
-    static_dir.mkdir(parents=True, exist_ok=True)
-    return static_dir
 
+class ExtractionProgress:
+    """Progress and throughput of the image workers"""
+    
+    def __init__(self, total: int, report_every: float = 2.0):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.bytes = 0
+        self.report_every = report_every
+        self.started = time.perf_counter()
+        self._last_report = self.started
+    
+    def advance(self, size: int, failed: bool = False):
+        self.done += 1
+        self.failed += failed
+        self.bytes += size
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_every or self.done == self.total:
+            self._last_report = now
+            print(f"  ⏳ {self.done}/{self.total} images - {self.summary()}")
+    
+    def summary(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"{elapsed:.1f}s, {self.done / elapsed:.1f} images/s, "
+                f"{self.bytes / elapsed / 1e6:.1f} MB/s")
+
+
+def reusable_images(db: Session) -> dict:
+    """
+    Images a previous import already stored and encoded, by blob sha256.
+    An image is reused when its blob file is in the store and a question
+    recorded its preview plus a rendition file for every format and width the
+    current settings ask for (rendition files are content-hashed, so they are
+    valid as long as they exist). Read before the exam tables are dropped.
+    """
+    if not inspect(db.get_bind()).has_table(QuestionImageRendition.__tablename__):
+        return {}
+    blobs = {b.sha256: b for b in db.execute(select(ImageBlob)).scalars()}
+    renditions = {}  # (sha256, question id) -> [RenditionFile]
+    previews = {}  # sha256 -> ImagePreview
+    rows = db.execute(
+        select(QuestionImageRendition, ExamQuestionItem.image_width, ExamQuestionItem.image_height,
+               ExamQuestionItem.image_color, ExamQuestionItem.image_placeholder)
+        .join(ExamQuestionItem, ExamQuestionItem.id == QuestionImageRendition.question_id)
+        .where(QuestionImageRendition.source_sha256.in_(blobs), ExamQuestionItem.image_placeholder.isnot(None))
+    )
+    for rendition, *preview in rows:
+        sha256 = rendition.source_sha256
+        previews.setdefault(sha256, ImagePreview(*preview))
+        renditions.setdefault((sha256, rendition.question_id), []).append(RenditionFile(
+            rendition.format, rendition.width, rendition.height, rendition.byte_size, rendition.path
+        ))
 
-def extract_images_from_excel(workbook, worksheet, static_dir):
+    reusable = {}
+    for (sha256, _), files in renditions.items():
+        if sha256 in reusable:
+            continue
+        blob, preview = blobs[sha256], previews[sha256]
+        expected = {(fmt, w) for fmt in ENCODABLE_FORMATS for w in target_widths(preview.width, IMAGE_RENDITION_WIDTHS)}
+        if {(f.format, f.width) for f in files} != expected or not os.path.exists(blob_store.path(sha256, blob.extension)):
+            continue
+        if all(os.path.exists(os.path.join(RENDITIONS_DIR, os.path.basename(f.path))) for f in files):
+            stored = StoredBlob(sha256, blob.extension, blob.byte_size, False)
+            reusable[sha256] = IngestedImage(stored, preview, files)
+    return reusable
+
+
+def extract_images_from_excel(workbook, worksheet, workers=IMPORT_IMAGE_WORKERS, max_in_flight=IMPORT_MAX_IN_FLIGHT,
+                              reusable=None):
     """
-    Extract all images from Excel and save them
-    Returns dict mapping row numbers to image filenames
+    Validate, store and encode all images from Excel on a process pool
+    Workers write blobs and renditions to disk as they finish; at most
+    max_in_flight images are held in memory / queued at once. Images in
+    reusable (see reusable_images) are not decoded or encoded again.
+    Returns dict mapping row numbers to IngestedImage
     """
-    print("📸 Extracting images from Excel...")
+    print(f"📸 Extracting images from Excel ({workers} workers, {max_in_flight} in flight)...")
+    if UNAVAILABLE_FORMATS:
+        print(f"  ⚠️  This Pillow build cannot encode {', '.join(UNAVAILABLE_FORMATS)}; skipping those renditions")
     image_map = {}
     
-    if not hasattr(worksheet, '_images'):
+    images = getattr(worksheet, '_images', [])
+    if not images:
         print("  ⚠️  No images found in worksheet")
         return image_map
     
-    for idx, img in enumerate(worksheet._images):
-        try:
-            # Get the row number where the image is anchored
-            # _from is the top-left cell anchor
-            row_number = img.anchor._from.row + 1  # +1 because Excel rows are 1-indexed
-            
-            # Generate filename
-            filename = f"vraag_{row_number}.png"
-            filepath = static_dir / filename
-            
-            # Save image
-            image_data = img._data()
-            with open(filepath, 'wb') as f:
-                f.write(image_data)
+    progress = ExtractionProgress(len(images))
+    reusable = reusable or {}
+    results = {}  # sha256 -> IngestedImage; identical images are processed once
+    rows = {}  # sha256 -> [(image index, row)] waiting for that result
+    pending = {}  # future -> (sha256, size)
+    failed = set()
+    # Image index per row: when several images share a row, the last one wins (as before)
+    winners = {}
+    
+    def assign(sha256, idx, row_number):
+        if idx >= winners.get(row_number, -1):
+            winners[row_number] = idx
+            image_map[row_number] = results[sha256]
+    
+    def collect(futures):
+        for future in futures:
+            sha256, size = pending.pop(future)
+            waiting = rows.pop(sha256)
+            try:
+                results[sha256] = future.result()
+            except Exception as e:
+                failed.add(sha256)
+                print(f"  ✗ Error processing image {waiting[0][0]} (rows {', '.join(str(r) for _, r in waiting)}): {e}")
+            else:
+                if results[sha256].errors:
+                    # The original is stored and linked; only these derivatives are missing
+                    print(f"  ⚠️  Image {waiting[0][0]} stored without some derivatives: "
+                          f"{'; '.join(results[sha256].errors)}")
+            for idx, row_number in waiting:
+                if sha256 in results:
+                    assign(sha256, idx, row_number)
+                progress.advance(size, failed=sha256 in failed)
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for idx, img in enumerate(images):
+            try:
+                # Get the row number where the image is anchored
+                # _from is the top-left cell anchor
+                row_number = img.anchor._from.row + 1  # +1 because Excel rows are 1-indexed
+                data = img._data()
+            except Exception as e:
+                print(f"  ✗ Error extracting image {idx}: {e}")
+                progress.advance(0, failed=True)
+                continue
             
-            # Store mapping
-            image_map[row_number] = filename
-            print(f"  ✓ Saved image for row {row_number}: {filename}")
+            sha256 = hashlib.sha256(data).hexdigest()
+            if sha256 in reusable and sha256 not in results:
+                results[sha256] = reusable[sha256]
+            if sha256 in results or sha256 in failed:
+                if sha256 in results:
+                    assign(sha256, idx, row_number)
+                progress.advance(len(data), failed=sha256 in failed)
+                continue
+            if sha256 in rows:
+                rows[sha256].append((idx, row_number))  # Same image is being processed already
+                continue
+            rows[sha256] = [(idx, row_number)]
+            pending[pool.submit(ingest_image, data)] = (sha256, len(data))
             
-        except Exception as e:
-            print(f"  ✗ Error extracting image {idx}: {e}")
+            # Bounded queue: wait for a worker before reading the next image
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(wait(pending).done)
     
-    print(f"  📊 Total images extracted: {len(image_map)}")
+    written = sum(image.blob.written for image in results.values())
+    reused = sum(sha256 in reusable for sha256 in results)
+    print(f"  📊 Total images extracted: {len(image_map)} "
+          f"({len(results)} unique, {written} new blobs, {len(results) - written} already stored, "
+          f"{reused} reused without encoding, {progress.failed} failed) in {progress.summary()}")
     return image_map
 
 
-def parse_excel_data(worksheet, image_map, static_dir):
+def parse_excel_data(worksheet, image_map, store: BlobStore):
     """
     Parse questions and answers from Excel
     Returns list of question data dictionaries
@@ -138,14 +265,15 @@ def parse_excel_data(worksheet, image_map, static_dir):
             
             # Check if image exists for this row
             image_url = None
-            if excel_row_num in image_map:
-                filename = image_map[excel_row_num]
-                image_url = f"http://localhost:8000/static/images/{filename}"
+            image = image_map.get(excel_row_num)
+            if image:
+                image_url = f"{IMAGE_BASE_URL}{store.url(image.blob.sha256, image.blob.extension)}"
             
             question_data = {
                 "number": question_num,
                 "text": question_text,
                 "image_url": image_url,
+                "image": image,
                 "type": q_type,
                 "cbr_topic": cbr_theme,
                 "cbr_subtopic": cbr_topic,
@@ -184,6 +312,15 @@ def create_exams_and_questions(db: Session, questions_data):
             explanation=None # Could use correct answer text as explanation
         )
         
+        # Preview and renditions were computed by the image workers (the preview is
+        # missing when the original could not be decoded; the image is still linked)
+        image = q_data["image"]
+        if image and image.preview:
+            question.image_width, question.image_height, question.image_color, question.image_placeholder = image.preview
+            question.image_renditions = [
+                QuestionImageRendition(source_sha256=image.blob.sha256, **r._asdict()) for r in image.renditions
+            ]
+        
         # Add answer options
         for order, ans in enumerate(q_data["answers"]):
             answer = ExamAnswerOption(
@@ -199,6 +336,22 @@ def create_exams_and_questions(db: Session, questions_data):
     db.flush()  # Flush to get IDs
     print(f"  ✓ Created {len(question_items)} question items")
     
+    # Record the blobs and which question shows which one
+    blobs = {q["image"].blob.sha256: q["image"].blob for q in questions_data if q["image"]}
+    known = set(db.execute(
+        select(ImageBlob.sha256).where(ImageBlob.sha256.in_(blobs))
+    ).scalars()) if blobs else set()
+    db.add_all(
+        ImageBlob(sha256=b.sha256, extension=b.extension, byte_size=b.byte_size)
+        for sha256, b in blobs.items() if sha256 not in known
+    )
+    db.flush()
+    db.add_all(
+        QuestionImage(question_id=question.id, blob_sha256=q_data["image"].blob.sha256)
+        for question, q_data in zip(question_items, questions_data) if q_data["image"]
+    )
+    print(f"  ✓ Linked images ({len(blobs)} blobs, {len(blobs) - len(known)} new)")
+    
     # Now create exams and link questions
     print(f"  Creating {exam_count} exams...")
     for i in range(exam_count):
@@ -239,9 +392,7 @@ def main():
     
     print(f"📂 Excel file: {excel_file}")
     
-    # Create static folder
-    static_dir = create_static_folder()
-    print(f"📂 Static images folder: {static_dir}")
+    print(f"📂 Image store: {blob_store.root}")
     print()
     
     # Load Excel
@@ -255,11 +406,19 @@ def main():
         print(f"❌ Error loading Excel: {e}")
         return
     
+    # Images a previous import already encoded (read before the tables are dropped)
+    db = SessionLocal()
+    try:
+        reusable = reusable_images(db)
+    finally:
+        db.close()
+    print(f"♻️  {len(reusable)} images already stored and encoded")
+    
     # Extract images
-    image_map = extract_images_from_excel(workbook, worksheet, static_dir)
+    image_map = extract_images_from_excel(workbook, worksheet, reusable=reusable)
     
     # Parse questions
-    questions_data = parse_excel_data(worksheet, image_map, static_dir)
+    questions_data = parse_excel_data(worksheet, image_map, blob_store)
     
     if not questions_data:
         print("❌ No questions found in Excel!")
@@ -269,8 +428,11 @@ def main():
     print("\n🗄️  Connecting to database...")
     
     # Recreate tables
+    # Blobs (image_blobs) are kept, so a re-import only adds new images
     print("  ⚠️  Dropping existing exam tables...")
     Base.metadata.drop_all(bind=engine, tables=[
+        Base.metadata.tables['question_images'],
+        Base.metadata.tables['question_image_renditions'],
         Base.metadata.tables['exam_answer_options'],
         Base.metadata.tables['exam_questions_link'],
         Base.metadata.tables['exam_question_items'],
@@ -297,7 +459,7 @@ def main():
         print()
         print("Next steps:")
         print("  1. Start backend: uvicorn main:app --port 8000 --reload")
-        print("  2. Access images at: http://localhost:8000/static/images/")
+        print("  2. Remove images no question uses: python scripts/gc_image_blobs.py")
         print("  3. Login as admin and view exams in Admin Dashboard")
         print()
         
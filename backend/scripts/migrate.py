@@ -0,0 +1,28 @@
+"""
+Apply pending schema migrations (see migrations.py).
+Run before starting the API, after every deploy:
+    python scripts/migrate.py            # apply everything pending
+    python scripts/migrate.py --status   # list applied / pending versions
+"""
+import sys
+import os
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from migrations import MIGRATIONS, applied_versions, migrate
+
+if "--status" in sys.argv:
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+    for migration in MIGRATIONS:
+        state = "applied" if migration.version in applied else "pending"
+        print(f"{migration.version:04d} {migration.name}: {state}")
+    sys.exit(0)
+
+print("Applying migrations...")
+applied = migrate(engine)
+for migration in applied:
+    print(f"  ✅ {migration.version:04d} {migration.name}")
+print(f"✅ Database is up to date ({len(applied)} applied).")
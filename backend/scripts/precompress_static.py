@@ -0,0 +1,64 @@
+"""
+Write precompressed siblings (<file>.gz, and <file>.br when the brotli
+package is installed) for the compressible files under static/, which
+static_assets.AssetFiles sends to clients that accept them. Images are
+skipped; they are compressed already.
+    python scripts/precompress_static.py
+"""
+import sys
+import os
+import gzip
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mimetypes import guess_type
+
+from config import STATIC_DIR
+from static_assets import PRECOMPRESSED, is_compressible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# A variant that saves less than this is not worth a second file
+MIN_SAVING = 0.1
+
+COMPRESSORS = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=11)
+
+
+def main():
+    variant_extensions = tuple(extension for _, extension in PRECOMPRESSED)
+    written = skipped = 0
+    for root, _, files in os.walk(STATIC_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(variant_extensions) or not is_compressible(guess_type(path)[0] or ""):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            mtime = os.path.getmtime(path)
+            for coding, extension in PRECOMPRESSED:
+                if coding not in COMPRESSORS:
+                    continue
+                target = path + extension
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    skipped += 1
+                    continue
+                compressed = COMPRESSORS[coding](data)
+                if len(compressed) > len(data) * (1 - MIN_SAVING):
+                    continue
+                with open(target, "wb") as f:
+                    f.write(compressed)
+                written += 1
+                print(f"  ✓ {os.path.relpath(target, STATIC_DIR)} ({len(data)} -> {len(compressed)} bytes)")
+    if brotli is None:
+        print("  ⚠️  brotli not installed, only gzip variants were written")
+    print(f"✅ Wrote {written} variants ({skipped} up to date)")
+
+
+if __name__ == "__main__":
+    main()
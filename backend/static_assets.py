@@ -0,0 +1,182 @@
+"""
+Static file serving for /static.
+Content-hashed files (renditions, e.g. 1e4531a706d15df6-1024w.webp) are sent
+with an immutable, year-long Cache-Control; other files are revalidated.
+Every file gets a strong ETag and byte-range support. A precompressed
+sibling (<file>.br / <file>.gz, see scripts/precompress_static.py) is sent
+instead of a compressible file when the client accepts it. Small files are
+served from an in-memory LRU; large ones go through FileResponse, which
+hands the path to the server (http.response.pathsend) where supported.
+"""
+import hashlib
+import os
+import re
+from email.utils import formatdate
+from mimetypes import guess_type
+from typing import Optional, Tuple, Union
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from cache import LRUCache
+from config import (
+    STATIC_CACHE_CONTROL,
+    STATIC_IMMUTABLE_CACHE_CONTROL,
+    STATIC_MEMORY_CACHE_FILES,
+    STATIC_MEMORY_MAX_FILE_BYTES,
+)
+
+# <hex digest>[-<width>w].<ext>
+HASHED_NAME = re.compile(r"^(?P<digest>[0-9a-f]{16,64})(?:-\d+w)?\.[A-Za-z0-9]+$")
+
+# Preference order; images are already compressed and never get variants
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+UNSATISFIABLE = "unsatisfiable"
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(header: str) -> set:
+    """Codings of an Accept-Encoding header with a non-zero q"""
+    accepted = set()
+    for part in header.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    if "*" in accepted:
+        accepted.update(coding for coding, _ in PRECOMPRESSED)
+    return accepted
+
+
+def requested_range(
+    request_headers: Headers, etag: str, last_modified: str, size: int
+) -> Union[None, str, Tuple[int, int]]:
+    """
+    The single byte range (start, end inclusive) to send, UNSATISFIABLE, or
+    None for the whole file. Multi-range and malformed requests get the
+    whole file, which RFC 9110 allows.
+    """
+    header = request_headers.get("range")
+    if not header:
+        return None
+    if_range = request_headers.get("if-range")
+    if if_range and if_range not in (etag, last_modified):
+        return None
+    units, _, spec = header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                return UNSATISFIABLE
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+    except ValueError:
+        return None
+    if start >= size:
+        return UNSATISFIABLE
+    return start, end
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles with long-lived caching headers, precompressed variants and a memory tier"""
+
+    def __init__(
+        self,
+        *args,
+        memory_files: int = STATIC_MEMORY_CACHE_FILES,
+        memory_max_bytes: int = STATIC_MEMORY_MAX_FILE_BYTES,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        # (path, mtime_ns, size) -> file bytes; a rewritten file gets a new key
+        self.memory = LRUCache(maxsize=memory_files)
+        self.memory_max_bytes = memory_max_bytes
+
+    @staticmethod
+    def etag(full_path: str, stat_result: os.stat_result, encoding: Optional[str]) -> str:
+        suffix = f"-{encoding}" if encoding else ""
+        match = HASHED_NAME.match(os.path.basename(full_path))
+        if match:
+            # The name is the content hash
+            return f'"{match.group("digest")}{suffix}"'
+        version = f"{full_path}:{stat_result.st_ino}:{stat_result.st_mtime_ns}:{stat_result.st_size}"
+        return f'"{hashlib.blake2b(version.encode(), digest_size=16).hexdigest()}{suffix}"'
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        full_path = str(full_path)
+        request_headers = Headers(scope=scope)
+        media_type = guess_type(full_path)[0] or "text/plain"
+        immutable = HASHED_NAME.match(os.path.basename(full_path)) is not None
+        headers = {
+            "cache-control": STATIC_IMMUTABLE_CACHE_CONTROL if immutable else STATIC_CACHE_CONTROL,
+            "accept-ranges": "bytes",
+        }
+
+        encoding = None
+        if is_compressible(media_type):
+            headers["vary"] = "Accept-Encoding"
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            for coding, extension in PRECOMPRESSED:
+                if coding not in accepted:
+                    continue
+                try:
+                    variant_stat = os.stat(full_path + extension)
+                except OSError:
+                    continue
+                full_path, stat_result, encoding = full_path + extension, variant_stat, coding
+                headers["content-encoding"] = coding
+                break
+
+        headers["etag"] = self.etag(full_path, stat_result, encoding)
+        headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        if self.is_not_modified(Headers(headers=headers), request_headers):
+            return NotModifiedResponse(Headers(headers=headers))
+
+        if stat_result.st_size <= self.memory_max_bytes:
+            return self.memory_response(full_path, stat_result, media_type, headers, request_headers, status_code)
+        return FileResponse(
+            full_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result
+        )
+
+    def memory_response(self, full_path, stat_result, media_type, headers, request_headers, status_code) -> Response:
+        key = (full_path, stat_result.st_mtime_ns, stat_result.st_size)
+        data = self.memory.get(key)
+        if data is None:
+            # At most memory_max_bytes, read once per worker
+            with open(full_path, "rb") as f:
+                data = f.read()
+            self.memory.set(key, data)
+
+        byte_range = requested_range(request_headers, headers["etag"], headers["last-modified"], len(data))
+        if byte_range is None:
+            return Response(data, status_code=status_code, headers=headers, media_type=media_type)
+        if byte_range == UNSATISFIABLE:
+            return Response(status_code=416, headers={"content-range": f"bytes */{len(data)}"})
+        start, end = byte_range
+        headers["content-range"] = f"bytes {start}-{end}/{len(data)}"
+        return Response(data[start:end + 1], status_code=206, headers=headers, media_type=media_type)
+
+    def stats(self) -> dict:
+        return {"memory": self.memory.stats(), "memory_max_file_bytes": self.memory_max_bytes}
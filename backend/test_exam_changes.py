@@ -0,0 +1,173 @@
+"""
+Behavior of diff-based exam updates (exam_changes.py) through the admin
+update endpoint: what the saved exam looks like afterwards, and which
+caches are refreshed. Uses the throwaway SQLite database set up in
+conftest.py.
+
+Run: python -m pytest test_exam_changes.py
+"""
+import pytest
+
+from database import SessionLocal
+from exam_cache import answer_keys
+from models import ExamAnswerOption, ExamQuestionItem, exam_questions_association
+
+
+@pytest.fixture
+def admin(auth_headers):
+    return auth_headers("admin")
+
+
+def detail(client, admin, exam_id):
+    response = client.get(f"/api/admin/exams/{exam_id}", headers=admin)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def save(client, admin, exam_id, questions):
+    response = client.put(f"/api/admin/exams/{exam_id}", headers=admin, json={"questions": questions})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def question_ids(exam):
+    return [q["id"] for q in exam["questions"]]
+
+
+def test_reorder_keeps_questions(client, admin, make_exam):
+    exam_id = make_exam(4)
+    before = detail(client, admin, exam_id)
+
+    saved = save(client, admin, exam_id, list(reversed(before["questions"])))
+    assert question_ids(saved) == list(reversed(question_ids(before)))
+    assert question_ids(detail(client, admin, exam_id)) == question_ids(saved)
+    # Only the links moved; questions and answers are the same rows
+    assert [q["answers"] for q in saved["questions"]] == [q["answers"] for q in reversed(before["questions"])]
+
+
+def test_remove_and_add_question(client, admin, make_exam):
+    exam_id = make_exam(3)
+    before = detail(client, admin, exam_id)
+    removed, *kept = before["questions"]
+    new = {
+        "question_text": "Nieuwe vraag",
+        "cbr_topic": "Kennis",
+        "answers": [{"answer_text": "Ja", "is_correct": True}, {"answer_text": "Nee", "is_correct": False}],
+    }
+
+    saved = save(client, admin, exam_id, kept + [new])
+    assert question_ids(saved)[:2] == [q["id"] for q in kept]
+    assert removed["id"] not in question_ids(saved)
+    added = saved["questions"][2]
+    assert added["id"] not in question_ids(before)
+    assert added["question_text"] == "Nieuwe vraag"
+    assert sorted((a["answer_text"], a["is_correct"]) for a in added["answers"]) == [("Ja", True), ("Nee", False)]
+
+    db = SessionLocal()
+    try:
+        # Removing unlinks the question; the item stays for other exams and the answer history
+        assert db.get(ExamQuestionItem, removed["id"]) is not None
+    finally:
+        db.close()
+
+
+def test_duplicate_question_id_is_saved_as_a_copy(client, admin, make_exam):
+    exam_id = make_exam(2)
+    before = detail(client, admin, exam_id)
+    first = before["questions"][0]
+
+    saved = save(client, admin, exam_id, before["questions"] + [first])
+    ids = question_ids(saved)
+    assert len(ids) == 3 and len(set(ids)) == 3
+    assert ids[:2] == question_ids(before)
+    copy = saved["questions"][2]
+    assert copy["question_text"] == first["question_text"]
+    # The copy gets answers of its own
+    assert not {a["id"] for a in copy["answers"]} & {a["id"] for a in first["answers"]}
+
+
+def test_answer_id_of_another_question_is_not_moved(client, admin, make_exam):
+    exam_id = make_exam(2)
+    before = detail(client, admin, exam_id)
+    target, other = before["questions"]
+    foreign = dict(other["answers"][0], answer_text="Geleend antwoord")
+    questions = [dict(target, answers=target["answers"] + [foreign]), other]
+
+    saved = save(client, admin, exam_id, questions)
+    target_after, other_after = saved["questions"]
+    # Saved as a new answer on the target question...
+    borrowed = [a for a in target_after["answers"] if a["answer_text"] == "Geleend antwoord"]
+    assert len(borrowed) == 1 and borrowed[0]["id"] != foreign["id"]
+    # ...while the other question keeps its own answer unchanged
+    assert other_after["answers"] == other["answers"]
+
+
+def test_changing_correct_answer_refreshes_answer_key(client, admin, auth_headers, make_exam):
+    exam_id = make_exam(1)
+    question = detail(client, admin, exam_id)["questions"][0]
+    old_correct, new_correct = sorted(question["answers"], key=lambda a: a["order"])[:2]
+    check = {"question_id": question["id"], "selected_option_id": new_correct["id"]}
+    student = auth_headers("student")
+    assert client.post("/api/student/exams/check-answer", headers=student, json=check).json()["is_correct"] is False
+
+    answers = [dict(a, is_correct=a["id"] == new_correct["id"]) for a in question["answers"]]
+    save(client, admin, exam_id, [dict(question, answers=answers)])
+
+    key = answer_keys.get(question["id"])
+    assert key is not None and key.correct_option_ids == {new_correct["id"]}
+    result = client.post("/api/student/exams/check-answer", headers=student, json=check).json()
+    assert result["is_correct"] is True
+    assert result["correct_answer_text"] == new_correct["answer_text"]
+    db = SessionLocal()
+    try:
+        assert db.get(ExamAnswerOption, old_correct["id"]).is_correct is False
+    finally:
+        db.close()
+
+
+def test_shared_question_edit_reaches_simulation_exam(client, admin, auth_headers, make_exam):
+    exam_id = make_exam(2)
+    simulation_id = make_exam(1, category="CBR Simulatie", title="CBR Simulatie test")
+    shared = detail(client, admin, exam_id)["questions"][0]
+    db = SessionLocal()
+    try:
+        db.execute(exam_questions_association.insert().values(exam_id=simulation_id, question_id=shared["id"], order=1))
+        db.commit()
+    finally:
+        db.close()
+
+    student = auth_headers("student")
+    start = client.get(f"/api/student/exams/{simulation_id}/start", headers=student)
+    assert start.json()["questions"][1]["id"] == shared["id"]
+    etag = start.headers["etag"]
+    # Served from the snapshot while nothing changes
+    assert client.get(f"/api/student/exams/{simulation_id}/start",
+                      headers={**student, "If-None-Match": etag}).status_code == 304
+
+    questions = detail(client, admin, exam_id)["questions"]
+    questions[0] = dict(questions[0], question_text="Aangepaste gedeelde vraag")
+    save(client, admin, exam_id, questions)
+
+    restart = client.get(f"/api/student/exams/{simulation_id}/start", headers={**student, "If-None-Match": etag})
+    assert restart.status_code == 200, restart.text
+    assert restart.headers["etag"] != etag
+    # Linked second in the simulation exam
+    assert restart.json()["questions"][1]["question_text"] == "Aangepaste gedeelde vraag"
+
+
+def test_topic_change_moves_answer_history(client, admin, auth_headers, users, make_exam):
+    from test_exam_submit import topic_stats
+
+    exam_id = make_exam(1, topics=("Inzicht",))
+    question = detail(client, admin, exam_id)["questions"][0]
+    correct = next(a for a in question["answers"] if a["is_correct"])
+    submit = client.post(f"/api/student/exams/{exam_id}/submit", headers=auth_headers("student"), json={
+        "answers": [{"question_id": question["id"], "selected_option_id": correct["id"]}]
+    })
+    assert submit.status_code == 200, submit.text
+    before = topic_stats(users["student"])
+
+    save(client, admin, exam_id, [dict(question, cbr_topic="Gevaarherkenning")])
+    after = topic_stats(users["student"])
+    assert after["Gevaarherkenning"][0] == before.get("Gevaarherkenning", (0, 0))[0] + 1
+    assert after.get("Inzicht", (0, 0))[0] == before["Inzicht"][0] - 1
@@ -0,0 +1,106 @@
+"""
+Server-side grading in submit_exam: the score, the stored responses and
+the per-topic counters behind /student/progress, plus the answers it
+refuses before writing anything.
+
+Run: python -m pytest test_exam_submit.py
+"""
+import pytest
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import UserExamAttempt, UserQuestionResponse, UserTopicStat
+
+
+@pytest.fixture
+def exam(make_exam, client, auth_headers):
+    """A 4-question exam over two topics, as the student sees it after start"""
+    exam_id = make_exam(4, topics=("Kennis", "Inzicht"), title="Inleveren")
+    start = client.get(f"/api/student/exams/{exam_id}/start", headers=auth_headers("student"))
+    assert start.status_code == 200, start.text
+    return start.json()
+
+
+def option(question, index):
+    """Answer option id by its order (option 0 is the correct one)"""
+    return sorted(question["answers"], key=lambda a: a["order"])[index]["id"]
+
+
+def topic_stats(user_id):
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(UserTopicStat.cbr_topic, UserTopicStat.answered, UserTopicStat.correct)
+            .where(UserTopicStat.user_id == user_id)
+        ).all()
+        return {topic: (answered, correct) for topic, answered, correct in rows}
+    finally:
+        db.close()
+
+
+def count_rows(model, exam_id):
+    db = SessionLocal()
+    try:
+        return db.query(model).filter(model.exam_id == exam_id).count()
+    finally:
+        db.close()
+
+
+def test_submit_scores_and_counts_topics(client, auth_headers, users, exam):
+    questions = exam["questions"]  # link order: Kennis, Inzicht, Kennis, Inzicht
+    before = topic_stats(users["student"])
+    answers = [
+        {"question_id": questions[0]["id"], "selected_option_id": option(questions[0], 0)},
+        {"question_id": questions[1]["id"], "selected_option_id": option(questions[1], 0)},
+        {"question_id": questions[2]["id"], "selected_option_id": option(questions[2], 2)},
+    ]
+    response = client.post(f"/api/student/exams/{exam['id']}/submit", headers=auth_headers("student"),
+                           json={"answers": answers})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["score"], body["total"], body["is_passed"]) == (2, 4, False)
+    assert {r["question_id"]: r["is_correct"] for r in body["results"]} == {
+        questions[0]["id"]: True, questions[1]["id"]: True, questions[2]["id"]: False,
+    }
+    assert all(r["correct_answer_text"] == "Antwoord 0" for r in body["results"])
+
+    assert count_rows(UserQuestionResponse, exam["id"]) == 3
+    assert count_rows(UserExamAttempt, exam["id"]) == 1
+    after = topic_stats(users["student"])
+    delta = {
+        topic: (answered - before.get(topic, (0, 0))[0], correct - before.get(topic, (0, 0))[1])
+        for topic, (answered, correct) in after.items()
+    }
+    assert delta == {"Kennis": (2, 1), "Inzicht": (1, 1)}
+
+
+def test_submit_later_answer_wins(client, auth_headers, exam):
+    question = exam["questions"][0]
+    answers = [
+        {"question_id": question["id"], "selected_option_id": option(question, 1)},
+        {"question_id": question["id"], "selected_option_id": option(question, 0)},
+    ]
+    response = client.post(f"/api/student/exams/{exam['id']}/submit", headers=auth_headers("student"),
+                           json={"answers": answers})
+    assert response.status_code == 200, response.text
+    assert response.json()["score"] == 1
+    assert count_rows(UserQuestionResponse, exam["id"]) == 1
+
+
+@pytest.mark.parametrize("case", ["foreign_question", "foreign_option"])
+def test_submit_rejects_answers_outside_the_exam(client, auth_headers, make_exam, exam, case):
+    other = client.get(f"/api/student/exams/{make_exam(1)}/start", headers=auth_headers("student")).json()
+    other_question = other["questions"][0]
+    question = exam["questions"][0]
+    if case == "foreign_question":
+        bad = {"question_id": other_question["id"], "selected_option_id": option(other_question, 0)}
+    else:
+        bad = {"question_id": question["id"], "selected_option_id": option(other_question, 0)}
+    answers = [{"question_id": question["id"], "selected_option_id": option(question, 0)}, bad]
+
+    response = client.post(f"/api/student/exams/{exam['id']}/submit", headers=auth_headers("student"),
+                           json={"answers": answers})
+    assert response.status_code == 400, response.text
+    # Nothing is written for a refused submission
+    assert count_rows(UserQuestionResponse, exam["id"]) == 0
+    assert count_rows(UserExamAttempt, exam["id"]) == 0
@@ -0,0 +1,122 @@
+"""
+Query-count guard for the exam endpoints.
+Each endpoint must issue the same number of SELECTs for a 5-question and a
+50-question exam, so an N+1 (lazy-loaded answers per question) cannot creep
+back in. Uses the throwaway SQLite database set up in conftest.py.
+
+Run: python -m pytest test_query_counts.py
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from database import async_engine, async_read_engine
+from exam_cache import exam_snapshots
+
+SMALL, LARGE = 5, 50
+
+
+@contextmanager
+def count_selects():
+    counter = {"selects": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            counter["selects"] += 1
+
+    # Endpoints run on the async engines; events are registered on their sync core
+    targets = {async_engine.sync_engine, async_read_engine.sync_engine}
+    for target in targets:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+EXAM_IDS = {}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded_exams(make_exam):
+    EXAM_IDS.update({n: make_exam(n) for n in (SMALL, LARGE)})
+
+
+def selects_per_size(client, request):
+    """Run request(exam_id) for the small and large exam and return their SELECT counts"""
+    counts = {}
+    for n, exam_id in EXAM_IDS.items():
+        exam_snapshots.invalidate(exam_id)
+        with count_selects() as counter:
+            response = request(exam_id)
+        assert response.status_code < 300, response.text
+        counts[n] = counter["selects"]
+    return counts
+
+
+def assert_constant(client, request):
+    counts = selects_per_size(client, request)
+    assert counts[SMALL] == counts[LARGE], f"query count depends on question count: {counts}"
+    return counts
+
+
+def test_admin_exam_detail(client, auth_headers):
+    headers = auth_headers()
+    assert_constant(client, lambda exam_id: client.get(f"/api/admin/exams/{exam_id}", headers=headers))
+
+
+def test_student_exam_detail(client):
+    assert_constant(client, lambda exam_id: client.get(f"/api/student/exams/{exam_id}"))
+
+
+def test_start_exam(client, auth_headers):
+    headers = auth_headers()
+    assert_constant(client, lambda exam_id: client.get(f"/api/student/exams/{exam_id}/start", headers=headers))
+
+
+def test_update_exam(client, auth_headers):
+    headers = auth_headers()
+
+    def update(exam_id):
+        detail = client.get(f"/api/admin/exams/{exam_id}", headers=headers).json()
+        with count_selects() as counter:
+            response = client.put(f"/api/admin/exams/{exam_id}", headers=headers, json={
+                "title": detail["title"], "questions": detail["questions"]
+            })
+        update.counts.append(counter["selects"])
+        return response
+
+    update.counts = []
+    selects_per_size(client, update)
+    assert update.counts[0] == update.counts[1], f"query count depends on question count: {update.counts}"
+
+
+def test_create_exam(client, auth_headers):
+    headers = auth_headers()
+    counts = []
+    for n in (SMALL, LARGE):
+        payload = {
+            "title": f"Nieuw {n}",
+            "questions": [
+                {
+                    "question_text": f"Vraag {i}",
+                    "answers": [{"answer_text": f"A{j}", "is_correct": j == 0, "order": j} for j in range(4)],
+                }
+                for i in range(n)
+            ],
+        }
+        with count_selects() as counter:
+            response = client.post("/api/admin/exams", headers=headers, json=payload)
+        assert response.status_code == 201, response.text
+        assert [q["question_text"] for q in response.json()["questions"]] == [f"Vraag {i}" for i in range(n)]
+        counts.append(counter["selects"])
+    assert counts[0] == counts[1], f"query count depends on question count: {counts}"
+
+
+def test_questions_follow_link_order(client, auth_headers):
+    headers = auth_headers()
+    detail = client.get(f"/api/admin/exams/{EXAM_IDS[LARGE]}", headers=headers).json()
+    assert [q["question_text"] for q in detail["questions"]] == [f"Vraag {i}" for i in range(LARGE)]
+
@@ -0,0 +1,68 @@
+"""
+Query-plan check for the hot-path index pack (migration 0002).
+Each hot query is explained on a throwaway SQLite database without the
+index and again after the migration has created it: the plan must switch
+from scanning to searching the expected index. Uses the throwaway SQLite
+database set up in conftest.py.
+
+Run: python -m pytest test_query_plans.py
+"""
+import pytest
+from sqlalchemy import select, text
+
+from database import engine
+from migrations import HOT_PATH_INDEXES, create_hot_path_indexes
+from models import Exam, ExamQuestionItem, UserExamAttempt, UserQuestionResponse, exam_questions_association
+
+link = exam_questions_association
+
+# index name -> the statement the endpoint (or its eager load) issues
+HOT_QUERIES = {
+    # get_student_history
+    "ix_user_exam_attempts_user_completed": select(UserExamAttempt.id)
+        .where(UserExamAttempt.user_id == 1, UserExamAttempt.completed_at.isnot(None))
+        .order_by(UserExamAttempt.completed_at.desc(), UserExamAttempt.id.desc()).limit(10),
+    # list_student_exams / list_all_exams(is_published=...)
+    "ix_exams_published_created": select(Exam.id)
+        .where(Exam.is_published == True).order_by(Exam.created_at.desc()),
+    # Exam.questions selectinload (link order)
+    "ix_exam_questions_link_exam_order": select(link.c.question_id)
+        .where(link.c.exam_id == 1).order_by(link.c.order),
+    # topic pools / per-topic question lookups
+    "ix_exam_question_items_cbr_topic": select(ExamQuestionItem.id)
+        .where(ExamQuestionItem.cbr_topic == "Kennis"),
+    # per-user response history (topic stat rebuild)
+    "ix_user_question_responses_user_id": select(UserQuestionResponse.id)
+        .where(UserQuestionResponse.user_id == 1),
+    # responses per question (question edits / deletes)
+    "ix_user_question_responses_question_id": select(UserQuestionResponse.id)
+        .where(UserQuestionResponse.question_id == 1),
+}
+
+
+def query_plan(statement) -> str:
+    sql = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_every_pack_index_has_a_plan_check():
+    assert set(HOT_QUERIES) == {name for name, _, _ in HOT_PATH_INDEXES}
+
+
+@pytest.mark.usefixtures("migrated_engine")
+def test_index_pack_changes_plans():
+    with engine.begin() as conn:
+        for name in HOT_QUERIES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    before = {name: query_plan(statement) for name, statement in HOT_QUERIES.items()}
+
+    with engine.begin() as conn:
+        create_hot_path_indexes(conn)
+    after = {name: query_plan(statement) for name, statement in HOT_QUERIES.items()}
+
+    for name in HOT_QUERIES:
+        assert name not in before[name], f"{name} used before it existed: {before[name]}"
+        assert f"INDEX {name}" in after[name], f"{name} not used: {after[name]} (before: {before[name]})"
+
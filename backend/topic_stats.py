@@ -0,0 +1,84 @@
+"""
+Incremental per-user topic counters (user_topic_stats).
+Every recorded UserQuestionResponse adds to the counters of its question's
+cbr_topic in the same transaction, so /student/progress is a point lookup.
+When an admin moves a question to another topic, the counters of everyone
+who answered it are recomputed (apply_changeset).
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.engine import Connection
+
+from exam_cache import answer_keys
+from models import ExamQuestionItem, UserQuestionResponse, UserTopicStat
+
+
+def count_topic_deltas(rows: Iterable[dict]) -> Dict[Tuple[int, str], list]:
+    """Sum response rows into {(user_id, cbr_topic): [answered, correct]}"""
+    deltas: Dict[Tuple[int, str], list] = {}
+    for row in rows:
+        # The row was graded with this key; only its topic is needed here
+        key = answer_keys.get(row["question_id"], allow_stale=True)
+        if key is None or not key.cbr_topic:
+            continue
+        counter = deltas.setdefault((row["user_id"], key.cbr_topic), [0, 0])
+        counter[0] += 1
+        counter[1] += 1 if row["is_correct"] else 0
+    return deltas
+
+
+def _upsert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    table = UserTopicStat.__table__
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.cbr_topic],
+        set_={
+            "answered": table.c.answered + stmt.excluded.answered,
+            "correct": table.c.correct + stmt.excluded.correct,
+        },
+    )
+
+
+def apply_topic_stats(conn: Connection, rows: Iterable[dict]) -> None:
+    """Add freshly recorded response rows to the per-topic counters"""
+    deltas = count_topic_deltas(rows)
+    if not deltas:
+        return
+    params = [
+        {"user_id": user_id, "cbr_topic": topic, "answered": answered, "correct": correct}
+        for (user_id, topic), (answered, correct) in deltas.items()
+    ]
+    conn.execute(_upsert(conn.dialect.name), params)
+
+
+def rebuild_topic_stats(conn: Connection, question_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute the counters from the full response history; returns the row
+    count. With question_ids, only the users who answered those questions
+    are recomputed (a question moved to another topic).
+    """
+    if question_ids is None:
+        conn.execute(delete(UserTopicStat))
+    else:
+        users = select(UserQuestionResponse.user_id)\
+            .where(UserQuestionResponse.question_id.in_(list(question_ids))).distinct()
+        conn.execute(delete(UserTopicStat).where(UserTopicStat.user_id.in_(users)))
+    history = select(
+        UserQuestionResponse.user_id,
+        ExamQuestionItem.cbr_topic,
+        func.count(UserQuestionResponse.id),
+        func.sum(case((UserQuestionResponse.is_correct == True, 1), else_=0)),
+    ).join(ExamQuestionItem, UserQuestionResponse.question_id == ExamQuestionItem.id)\
+     .where(ExamQuestionItem.cbr_topic.isnot(None), ExamQuestionItem.cbr_topic != "")\
+     .group_by(UserQuestionResponse.user_id, ExamQuestionItem.cbr_topic)
+    if question_ids is not None:
+        history = history.where(UserQuestionResponse.user_id.in_(users))
+    conn.execute(
+        insert(UserTopicStat).from_select(["user_id", "cbr_topic", "answered", "correct"], history)
+    )
+    return conn.execute(select(func.count()).select_from(UserTopicStat)).scalar()
@@ -0,0 +1,99 @@
+"""
+Startup warmup and readiness.
+The lifespan hook runs the steps grading depends on (mapper configuration,
+answer key index) before accepting traffic, then warms the remaining caches
+in a background thread. /health/ready reports ready once that has finished,
+with the time every step took.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from config import WARMUP_EXAM_SNAPSHOTS
+from database import SessionLocal
+from exam_cache import exam_snapshots, topic_pools
+from models import Exam
+
+
+class Readiness:
+    """Startup progress of this worker (step timings in milliseconds)"""
+
+    def __init__(self):
+        self.process_started = time.perf_counter()
+        self.steps: Dict[str, float] = {}
+        self.startup_ms: Optional[float] = None
+        self.draining = False
+        self._ready = threading.Event()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set() and not self.draining
+
+    def begin(self) -> None:
+        self.draining = False
+        self._ready.clear()
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def mark_ready(self) -> None:
+        self.startup_ms = round((time.perf_counter() - self.process_started) * 1000, 1)
+        self._ready.set()
+        print(f"🚀 Ready in {self.startup_ms} ms ({', '.join(f'{k} {v} ms' for k, v in self.steps.items())})")
+
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self.is_ready else ("draining" if self.draining else "starting"),
+            "startup_ms": self.startup_ms,
+            "steps_ms": dict(self.steps),
+        }
+
+
+readiness = Readiness()
+
+
+def warm_exam_snapshots(db: Session, limit: int) -> int:
+    """Prebuild the start_exam payload of the newest published exams"""
+    from routers.exams import EXAM_DETAIL_OPTIONS, exam_source, student_start_payload
+
+    exam_ids = db.execute(
+        select(Exam.id)
+        .where(Exam.is_published == True, Exam.category != "CBR Simulatie")
+        .order_by(Exam.created_at.desc())
+        .limit(limit)
+    ).scalars().all()
+    exams = db.execute(
+        select(Exam).options(*EXAM_DETAIL_OPTIONS).where(Exam.id.in_(exam_ids))
+    ).scalars().all()
+    for exam in exams:
+        exam_snapshots.put(exam.id, exam_source(exam), student_start_payload(exam))
+    return len(exams)
+
+
+def warm_caches(app) -> None:
+    """Background part of the warmup; marks the worker ready when done"""
+    try:
+        with readiness.step("openapi_schema"):
+            app.openapi()
+        db = SessionLocal()
+        try:
+            with readiness.step("topic_pools"):
+                topic_pools.get(db)
+            if WARMUP_EXAM_SNAPSHOTS > 0:
+                with readiness.step("exam_snapshots"):
+                    warm_exam_snapshots(db, WARMUP_EXAM_SNAPSHOTS)
+        finally:
+            db.close()
+    except Exception as e:
+        # Caches fill on demand anyway; a failed warmup must not keep the worker out of rotation
+        print(f"⚠️  Cache warmup failed: {e}")
+    readiness.mark_ready()